@@ -5,6 +5,15 @@ import subprocess
 import webbrowser
 from typing import Any, Dict, List, Optional, Tuple
 from difflib import get_close_matches
+from screen_parser import capture_and_parse
+from text_entry import enter_text
+from app_registry import focus_process, is_shell_process, get_executable_index, get_process_table
+from config import INPUT_EVENT_GAP_S
+from metrics import PHASE_SECONDS
+
+# Minimal per-call gap instead of pyautogui's default fixed pause; settle waits
+# before screen-dependent steps are inserted by the plan executor instead
+pyautogui.PAUSE = INPUT_EVENT_GAP_S
 
 # Optional: for window activation
 try:
@@ -39,6 +48,7 @@ def _center_of_bbox(bbox: Any) -> Optional[Tuple[int, int]]:
         return None
     return None
 
+@PHASE_SECONDS.time(phase="match")
 def find_element_bbox(ui_elements: List[Dict[str, Any]], target_text: str) -> Optional[Any]:
     if not ui_elements or not target_text:
         return None
@@ -57,30 +67,24 @@ def find_element_bbox(ui_elements: List[Dict[str, Any]], target_text: str) -> Op
 # ---------------- Action functions ---------------- #
 
 def open_application(name: str) -> bool:
-    paths = {
-        "chrome": [r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-                   r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
-                   "chrome.exe"],
-        "notepad": ["notepad.exe"],
-        "explorer": ["explorer.exe"],
-        "calculator": ["calc.exe"],
-        "paint": ["mspaint.exe"]
-    }
-    for exe in paths.get(name.lower(), [name]):
-        try:
-            if os.path.isfile(exe) or exe.endswith(".exe"):
-                subprocess.Popen([exe])
-            else:
-                os.startfile(exe)
-            time.sleep(1)
-            return True
-        except:
-            continue
+    # An already-running app is focused instead of launching a second instance
+    pids = set() if is_shell_process(name) else get_process_table().pids(name)
+    if pids and focus_process(name, pids):
+        return True
+
+    exe = get_executable_index().resolve(name)
+    try:
+        if exe:
+            subprocess.Popen([exe])
+        else:
+            os.startfile(name)
+        return True
+    except Exception:
+        pass
     pyautogui.hotkey("win")
-    time.sleep(0.5)
+    time.sleep(0.5)  # let the Start menu open before typing
     pyautogui.write(name)
     pyautogui.press("enter")
-    time.sleep(1)
     return True
 
 def open_folder(name: str) -> bool:
@@ -95,31 +99,38 @@ def open_folder(name: str) -> bool:
         return True
     return False
 
-def execute_action(action_data: Dict[str, Any], ui_elements: List[Dict[str, Any]] = None) -> bool:
+def execute_action(action_data: Dict[str, Any], ui_elements: List[Dict[str, Any]] = None,
+                   region: Optional[Tuple[int, int, int, int]] = None) -> bool:
     action = action_data.get("action")
     target = action_data.get("target", "")
     text = action_data.get("text", "")
     keys = action_data.get("keys", "")
+    region = region or action_data.get("region")
 
     if action == "click":
-        if not target or not ui_elements:
+        if target and not ui_elements and region:
+            # Caller supplied only a region of interest: capture and parse it here
+            ui_elements = capture_and_parse(f"roi_click_{target.replace(' ', '_')}", target=target, region=tuple(region))
+        element_id = action_data.get("element_id")
+        if isinstance(element_id, int) and ui_elements and 0 <= element_id < len(ui_elements):
+            # Grounded plan: the planner picked the element directly
+            bbox = ui_elements[element_id].get("bbox")
+        elif not target or not ui_elements:
             return False
-        bbox = find_element_bbox(ui_elements, target)
+        else:
+            bbox = find_element_bbox(ui_elements, target)
         if not bbox:
             return False
         center = _center_of_bbox(bbox)
         if not center:
             return False
-        time.sleep(0.5)
         pyautogui.click(center[0], center[1])
         return True
 
     if action == "type":
         if target.lower() in ["address bar", "url bar"]:
             pyautogui.hotkey("ctrl", "l")
-            time.sleep(0.2)
-        pyautogui.write(text, interval=0.05)
-        return True
+        return enter_text(text, field=target)
 
     if action == "scroll":
         direction = -300 if target.lower() == "down" else 300
@@ -143,8 +154,7 @@ def execute_action(action_data: Dict[str, Any], ui_elements: List[Dict[str, Any]
         time.sleep(0.5)
         pyautogui.press("enter")
 
-        # Wait for page load
-        time.sleep(5)  # adjust depending on internet speed
+        # Page load is waited for by the plan executor (LOAD_SETTLE_S) before the next step
 
         # Activate browser window
         if gw:
@@ -153,7 +163,6 @@ def execute_action(action_data: Dict[str, Any], ui_elements: List[Dict[str, Any]
                 win = windows[0]
                 win.restore()
                 win.activate()
-                time.sleep(1)
 
         return True
 
@@ -162,8 +171,17 @@ def execute_action(action_data: Dict[str, Any], ui_elements: List[Dict[str, Any]
         pyautogui.hotkey(*key_list)
         return True
 
+    if action == "press":
+        key = (keys or target).strip().lower()
+        if not key:
+            return False
+        pyautogui.press(key)
+        return True
+
     if action == "wait":
-        time.sleep(2)
+        # Optimized plans carry the duration as a settle, already waited by the executor
+        if "settle" not in action_data:
+            time.sleep(2)
         return True
 
     return False
@@ -2,30 +2,205 @@
 
 import logging
 import time
-import os
-from instruction_parser import parse_instruction_with_llm
+from instruction_parser import plan_with_screen, planner_report, record_plan_outcome
 from action_executor import execute_action
-from screen_parser import get_ui_elements, capture_screen
+from screen_parser import capture_and_parse, parse_tier_report
+from capture_backends import get_backend
+from event_log import setup_logging, log_event
+from plan_optimizer import optimize_plan
+from input_batcher import KEYBOARD_ACTIONS, PlanInjector, coalesce_plan, settle_before
+from screenshot_store import get_screenshot_store
+from location_memory import get_location_memory
+from planner_client import get_planner_client
+from metrics import PHASE_SECONDS, STEP_SECONDS, STEPS, start_metrics_server
+from profiling import phase, profile_instruction, session_profile_dir
 import sys
+from typing import Any, Dict, List, Optional, Tuple
+from config import ENABLE_GROUNDED_PLANNING, METRICS_HOST, METRICS_PORT
 
 sys.stdout.reconfigure(encoding='utf-8')
 sys.stderr.reconfigure(encoding='utf-8')
 
 # ---------------- Logging ---------------- #
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("agent.log"), logging.StreamHandler()]
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
-SCREENSHOT_DIR = os.path.join(os.getcwd(), "screenshots")
-os.makedirs(SCREENSHOT_DIR, exist_ok=True)
+# ---------------- Plan Execution ---------------- #
+# Phase recorded for a non-keyboard step's execution: input injection vs launching an app/page
+EXECUTE_PHASES = {"click": "inject", "scroll": "inject", "open": "launch", "navigate": "launch"}
+
+def _log_step(instruction, idx, action, success, parse_ms, exec_ms, step_start, **fields):
+    STEPS.inc(action=action.get("action", ""), result="ok" if success else "failed")
+    STEP_SECONDS.observe(time.perf_counter() - step_start, action=action.get("action", ""))
+    log_event("step", instruction=instruction, idx=idx, action=action.get("action", ""),
+              target=action.get("target", ""), success=success, parse_ms=parse_ms, exec_ms=exec_ms,
+              total_ms=(time.perf_counter() - step_start) * 1000, **fields)
+
+def execute_plan(instruction: str, actions: List[Dict[str, Any]],
+                 plan_elements: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Execute a plan step by step. Consecutive keyboard steps are injected as one
+    batch, and settle waits only precede steps that need fresh screen state.
+    plan_elements are the ui_elements a grounded plan's element_ids refer to.
+    A location-memory click is forgotten if a step fails before the next
+    non-keyboard step succeeds.
+    """
+    injector = PlanInjector()
+    since_settle: List[Dict[str, Any]] = []
+    remembered = None  # memory key behind the last non-keyboard step
+    completed = 0
+    success = True
+
+    for group in coalesce_plan(actions):
+        first = group[0]
+        wait = settle_before(since_settle, first)
+        if wait:
+            injector.settle(wait)
+            since_settle = []
+
+        if first.get("action") in KEYBOARD_ACTIONS:
+            for offset, action in enumerate(group):
+                print(f"Step {completed + offset + 1}/{len(actions)}: {action.get('action', '')} on '{action.get('target', '')}'")
+            step_start = time.perf_counter()
+            with phase("inject"):
+                done = injector.run_keyboard(group)
+            exec_ms = (time.perf_counter() - step_start) * 1000
+            for offset, action in enumerate(group[:done + 1]):
+                ok = offset < done
+                print(f" {action.get('action', '')} {'✅' if ok else '❌'}")
+                _log_step(instruction, completed + offset + 1, action, ok, 0.0, exec_ms / len(group), step_start,
+                          batched=True)
+            completed += done
+            since_settle.extend(group[:done])
+            if done < len(group):
+                if remembered:
+                    get_location_memory().forget(remembered)
+                success = False
+                break
+            continue
+
+        action = first
+        action_type = action.get("action", "")
+        target = action.get("target", "")
+        idx = completed + 1
+        print(f"Step {idx}/{len(actions)}: {action_type} on '{target}'")
+
+        ui_elements = []
+        step_start = time.perf_counter()
+        parse_ms = 0.0
+
+        element_id = action.get("element_id")
+        if plan_elements and isinstance(element_id, int) and 0 <= element_id < len(plan_elements):
+            if completed == 0:
+                # Nothing has run since planning, so the planner's screen is still current
+                ui_elements = plan_elements
+            else:
+                # The screen has changed: look the element up again by its text
+                action = {k: v for k, v in action.items() if k != "element_id"}
+                action["target"] = target = plan_elements[element_id].get("text") or target
+
+        # Capture and parse only for steps that consume ui_elements
+        if not ui_elements and action.get("needs_parse", action_type == "click"):
+            parse_start = time.perf_counter()
+            with phase("parse"):
+                ui_elements = capture_and_parse(
+                    f"step_{idx}_{action_type}_{target.replace(' ', '_')}",
+                    target=target,
+                    region=action.get("region"),
+                )
+            parse_ms = (time.perf_counter() - parse_start) * 1000
+
+        # Execute the action
+        exec_start = time.perf_counter()
+        with phase("execute"):
+            step_ok = execute_action(action, ui_elements)
+        exec_ms = (time.perf_counter() - exec_start) * 1000
+        if action_type in EXECUTE_PHASES:
+            PHASE_SECONDS.observe(exec_ms / 1000, phase=EXECUTE_PHASES[action_type])
+        _log_step(instruction, idx, action, step_ok, parse_ms, exec_ms, step_start)
+
+        memory_key = ui_elements[0].get("memory_key") if ui_elements else None
+        if not step_ok:
+            if memory_key or remembered:
+                get_location_memory().forget(memory_key or remembered)
+            print(f" {action_type} ❌")
+            success = False
+            break
+        print(f" {action_type} ✅")
+        remembered = memory_key
+        completed += 1
+        since_settle.append(action)
+
+    report = injector.report()
+    logger.info("Plan injection: %d events, %.0f events/s, %.0f ms idle",
+                report["injected_events"], report["events_per_s"], report["idle_ms"])
+    return {
+        "success": success,
+        "steps_completed": completed,
+        "steps_total": len(actions),
+        "failure": None if success else f"step {completed + 1}",
+        **report,
+    }
+
+def plan_instruction(instruction: str, grounded: bool = ENABLE_GROUNDED_PLANNING):
+    """
+    Plan one instruction; returns (actions, plan report, plan_ms, plan_elements).
+    Grounded plans capture the current screen first, so only blind plans can be
+    made ahead of execution. The whole screen is parsed: the foreground window
+    is usually the console the instruction was typed into.
+    """
+    start = time.perf_counter()
+    with phase("parse"):
+        plan_elements = capture_and_parse("plan", region=get_backend().bounds()) if grounded else None
+    with phase("plan"):
+        steps, grounded_ids = plan_with_screen(instruction, plan_elements)
+        actions, plan_report = optimize_plan(steps)
+    # Element ids only refer to plan_elements if the planner was actually shown some of them
+    plan_elements = plan_elements if grounded_ids else None
+    return actions, plan_report, (time.perf_counter() - start) * 1000, plan_elements
+
+def run_instruction(instruction: str, planned: Optional[Tuple] = None) -> Dict[str, Any]:
+    """
+    Plan (unless planned is a plan_instruction result made ahead of time) and
+    execute one instruction. Returns the outcome, which is also logged.
+    Instructions selected for profiling run under the sampling profiler.
+    """
+    with profile_instruction(instruction, session_profile_dir(get_screenshot_store())):
+        return _run_instruction(instruction, planned)
+
+def _run_instruction(instruction: str, planned: Optional[Tuple]) -> Dict[str, Any]:
+    logger.info("User Instruction: %s", instruction)
+    log_event("instruction", instruction=instruction)
+    actions, plan_report, plan_ms, plan_elements = planned or plan_instruction(instruction)
+    log_event("plan", instruction=instruction, steps=actions, plan_ms=plan_ms, **plan_report)
+    print(f"Plan: {plan_report['steps_out']} steps ({plan_report['steps_saved']} removed), "
+          f"{plan_report['parses_after']} screen parses ({plan_report['parses_saved']} saved)")
+    if not actions:
+        print("Failed to parse instruction")
+        result = {"success": False, "steps_completed": 0, "steps_total": 0, "failure": "plan",
+                  "plan_ms": plan_ms, "total_ms": plan_ms}
+        log_event("outcome", instruction=instruction, **result)
+        return result
+
+    exec_start = time.perf_counter()
+    result = execute_plan(instruction, actions, plan_elements)
+    record_plan_outcome("grounded" if plan_elements else "blind", result["success"])
+    result.update(plan_ms=plan_ms, total_ms=plan_ms + (time.perf_counter() - exec_start) * 1000)
+    memory = get_location_memory()
+    log_event("outcome", instruction=instruction,
+              location_memory_hit_rate=memory.hit_rate,
+              location_memory_saved_parse_s=memory.stats["saved_parse_s"],
+              parse_tiers=parse_tier_report(), planner=planner_report(),
+              planner_routing=get_planner_client().report(), **result)
+    return result
 
 # ---------------- Main Loop ---------------- #
 def main():
     print("🖥️  Computer Use Agent")
-    print(f" Screenshots will be saved in: {SCREENSHOT_DIR}\n")
+    store = get_screenshot_store()
+    print(f" Screenshots will be saved in: {store.root} (manifest: {store.manifest_path})\n")
+    if start_metrics_server():
+        print(f" Metrics at http://{METRICS_HOST}:{METRICS_PORT}/metrics\n")
     logger.info("Agent started")
 
     while True:
@@ -38,39 +213,7 @@ def main():
             if not instruction:
                 continue
 
-            logger.info(f"User Instruction: {instruction}")
-            actions = parse_instruction_with_llm(instruction)
-            if not actions:
-                print("Failed to parse instruction")
-                continue
-
-            for idx, action in enumerate(actions, start=1):
-                action_type = action.get("action", "")
-                target = action.get("target", "")
-                print(f"Step {idx}/{len(actions)}: {action_type} on '{target}'")
-
-                ui_elements = []
-
-                # Add delay and capture screenshot for open/navigate/click
-                if action_type in ["click", "open", "navigate"]:
-                    time.sleep(3)  # allow UI to update / page load
-                    screenshot_path = os.path.join(
-                        SCREENSHOT_DIR, f"step_{idx}_{action_type}_{target.replace(' ', '_')}.png"
-                    )
-                    capture_screen(screenshot_path)
-                    ui_elements = get_ui_elements(screenshot_path)
-
-                # Execute the action
-                success = execute_action(action, ui_elements)
-
-                if success:
-                    print(f" {action_type} ✅")
-                    if action_type in ["open", "navigate"]:
-                        time.sleep(1)  # additional wait for UI to settle
-                else:
-                    print(f" {action_type} ❌")
-                    break
-
+            run_instruction(instruction)
             print("=" * 60)
 
         except KeyboardInterrupt:
@@ -79,7 +222,7 @@ def main():
             break
         except Exception as e:
             print(f"Error: {e}")
-            logger.error(f"Error in main loop: {e}")
+            logger.exception("Error in main loop: %s", e)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,243 @@
+"""
+Cached registry of launchable executables and running processes.
+
+The executable index is built once from PATH and known install locations and
+persisted to disk; the process table is refreshed incrementally (only new PIDs
+are queried), so launch, close and "is it already running" checks are dict lookups.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+from config import APP_INDEX_FILE, APP_INDEX_TTL_S, APP_INDEX_MAX_DEPTH, PROCESS_REFRESH_S
+from metrics import CACHE_ENTRIES, CACHE_LOOKUPS
+
+# Optional: process listing
+try:
+    import psutil
+except:
+    psutil = None
+
+# Optional: focusing an existing process's window
+try:
+    from pywinauto.application import Application
+except:
+    Application = None
+try:
+    import pygetwindow as gw
+except:
+    gw = None
+
+logger = logging.getLogger(__name__)
+
+# Friendly names -> executable names (the first one is launched)
+APP_ALIASES = {
+    "chrome": ["chrome"],
+    "notepad": ["notepad"],
+    "explorer": ["explorer"],
+    "calculator": ["calc", "calculatorapp"],
+    "paint": ["mspaint"],
+    "wordpad": ["wordpad"],
+    "firefox": ["firefox"],
+    "edge": ["msedge"],
+}
+# Always running as part of the desktop; "open" must start a new window instead of focusing them
+SHELL_PROCESSES = {"explorer"}
+
+def _install_dirs() -> List[str]:
+    dirs = [os.environ.get("ProgramFiles"), os.environ.get("ProgramFiles(x86)")]
+    if os.environ.get("LOCALAPPDATA"):
+        dirs.append(os.path.join(os.environ["LOCALAPPDATA"], "Programs"))
+    if sys.platform == "darwin":
+        dirs.append("/Applications")
+    return [d for d in dirs if d and os.path.isdir(d)]
+
+def _exe_key(name: str) -> str:
+    name = os.path.basename(name.strip().lower())
+    return name[:-4] if name.endswith(".exe") else name
+
+def _candidates(name: str) -> List[str]:
+    key = _exe_key(name)
+    return APP_ALIASES.get(key, []) + [key]
+
+def is_shell_process(name: str) -> bool:
+    return any(key in SHELL_PROCESSES for key in _candidates(name))
+
+class ExecutableIndex:
+    def __init__(self, path: str = APP_INDEX_FILE, ttl_s: float = APP_INDEX_TTL_S):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.built = 0.0
+        self.exes: Dict[str, str] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.built, self.exes = data["built"], data["exes"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+    def _add(self, path: str):
+        # PATH entries are added first and win over install-dir matches
+        self.exes.setdefault(_exe_key(path), path)
+
+    def build(self):
+        start = time.perf_counter()
+        self.exes = {}
+        for d in os.environ.get("PATH", "").split(os.pathsep):
+            try:
+                for entry in os.scandir(d):
+                    if entry.is_file() and (entry.name.lower().endswith(".exe") or
+                                            (os.name != "nt" and os.access(entry.path, os.X_OK))):
+                        self._add(entry.path)
+            except OSError:
+                continue
+        for root in _install_dirs():
+            base_depth = root.rstrip(os.sep).count(os.sep)
+            for dirpath, dirnames, filenames in os.walk(root):
+                if dirpath.count(os.sep) - base_depth >= APP_INDEX_MAX_DEPTH:
+                    dirnames[:] = []
+                for filename in filenames:
+                    if filename.lower().endswith(".exe"):
+                        self._add(os.path.join(dirpath, filename))
+        self.built = time.time()
+        CACHE_ENTRIES.set(len(self.exes), cache="executable_index")
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"built": self.built, "exes": self.exes}, f)
+        except OSError as e:
+            logger.warning("Could not persist executable index: %s", e)
+        logger.info("Indexed %d executables in %.2fs", len(self.exes), time.perf_counter() - start)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Full path of the executable for an app name, or None if not indexed."""
+        if time.time() - self.built > self.ttl_s:
+            self.build()
+        for key in _candidates(name):
+            path = self.exes.get(key)
+            if path and os.path.exists(path):
+                CACHE_LOOKUPS.inc(cache="executable_index", result="hit")
+                return path
+        CACHE_LOOKUPS.inc(cache="executable_index", result="miss")
+        return None
+
+class ProcessTable:
+    def __init__(self, min_refresh_s: float = PROCESS_REFRESH_S):
+        self.min_refresh_s = min_refresh_s
+        self._last_refresh = 0.0
+        self._names: Dict[int, str] = {}  # pid -> executable key ("" if unreadable)
+        self._raw_names: Dict[int, str] = {}  # pid -> name as reported by the OS
+        self._pids: Dict[str, Set[int]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False):
+        """Drop exited PIDs and query names for new ones only."""
+        if psutil is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_refresh < self.min_refresh_s:
+                return
+            self._last_refresh = now
+            current = set(psutil.pids())
+            for pid in set(self._names) - current:
+                self._remove(pid)
+            new_pids = current - set(self._names)
+            # Known PIDs are served from the table; only new ones are queried
+            CACHE_LOOKUPS.inc(len(current) - len(new_pids), cache="process_table", result="hit")
+            CACHE_LOOKUPS.inc(len(new_pids), cache="process_table", result="miss")
+            for pid in new_pids:
+                try:
+                    raw = psutil.Process(pid).name()
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    raw = ""  # remembered so it is not queried again on every refresh
+                name = _exe_key(raw) if raw else ""
+                self._names[pid] = name
+                if not name:
+                    continue
+                self._raw_names[pid] = raw
+                self._pids[name].add(pid)
+            CACHE_ENTRIES.set(len(self._names), cache="process_table")
+
+    def _remove(self, pid: int):
+        self._raw_names.pop(pid, None)
+        name = self._names.pop(pid, None)
+        if name:
+            self._pids[name].discard(pid)
+            if not self._pids[name]:
+                del self._pids[name]
+
+    def forget(self, pid: int):
+        with self._lock:
+            self._remove(pid)
+
+    def pids(self, name: str) -> Set[int]:
+        """PIDs running the given app (alias or executable name)."""
+        self.refresh()
+        found = set()
+        for key in _candidates(name):
+            found |= self._pids.get(key, set())
+        return found
+
+    def matching(self, fragment: str) -> Dict[str, Set[int]]:
+        """Running process names containing fragment, with their PIDs."""
+        self.refresh()
+        fragment = _exe_key(fragment)
+        return {name: set(pids) for name, pids in self._pids.items() if fragment in name}
+
+    def names(self) -> List[str]:
+        """Distinct running process names, as reported by the OS."""
+        self.refresh()
+        return list(set(self._raw_names.values()))
+
+    def live_process(self, pid: int, name: str):
+        """
+        The psutil.Process for pid if it is still running the named executable.
+        A PID reused since the last refresh is dropped from the table instead.
+        """
+        try:
+            proc = psutil.Process(pid)
+            if _exe_key(proc.name()) == name:
+                return proc
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+        self.forget(pid)
+        return None
+
+def focus_process(name: str, pids: Set[int]) -> bool:
+    """Bring an already-running app's main window to the foreground."""
+    if Application is not None:
+        for pid in pids:
+            try:
+                Application(backend="uia").connect(process=pid).top_window().set_focus()
+                return True
+            except Exception:
+                continue
+    if gw:
+        windows = gw.getWindowsWithTitle(_exe_key(name).capitalize())
+        if windows:
+            try:
+                windows[0].restore()
+                windows[0].activate()
+                return True
+            except Exception:
+                pass
+    return False
+
+_index: Optional[ExecutableIndex] = None
+_processes: Optional[ProcessTable] = None
+
+def get_executable_index() -> ExecutableIndex:
+    global _index
+    if _index is None:
+        _index = ExecutableIndex()
+    return _index
+
+def get_process_table() -> ProcessTable:
+    global _processes
+    if _processes is None:
+        _processes = ProcessTable()
+    return _processes
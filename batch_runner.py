@@ -0,0 +1,154 @@
+"""
+Run instructions unattended from a JSONL file or stdin.
+
+Each input line is a JSON object with an "instruction" (or "body" / "title")
+key, or plain text. Plans are prefetched on a thread pool while earlier
+instructions execute; one result record per instruction is appended to the
+output JSONL, which doubles as the checkpoint for --resume.
+
+Usage:
+    python batch_runner.py [instructions.jsonl | -] [--output results.jsonl] [--resume] [--prefetch N]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, Set, TextIO
+from config import BATCH_PREFETCH, BATCH_RESULTS_FILE, ENABLE_GROUNDED_PLANNING
+from agent import plan_instruction, run_instruction
+from log_query import percentile
+from metrics import start_metrics_server
+
+logger = logging.getLogger(__name__)
+
+INSTRUCTION_KEYS = ("instruction", "body", "title")
+RESULT_FIELDS = ("success", "steps_completed", "steps_total", "failure", "plan_ms", "total_ms")
+
+def iter_instructions(stream: TextIO) -> Iterator[Dict[str, str]]:
+    """Yield {"id", "instruction"} records; ids default to the line number."""
+    for lineno, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = line
+        if not isinstance(record, dict):
+            record = {"instruction": str(record)}
+        text = next((str(record[k]).strip() for k in INSTRUCTION_KEYS if record.get(k)), "")
+        if not text:
+            logger.warning("Line %d has no instruction, skipped", lineno)
+            continue
+        yield {"id": str(record.get("request_id") or record.get("id") or f"line-{lineno}"), "instruction": text}
+
+def completed_ids(output_path: str) -> Set[str]:
+    """Ids already recorded in a previous run's output."""
+    done = set()
+    try:
+        with open(output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["id"])
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue  # a line cut short by an interrupted run
+    except FileNotFoundError:
+        pass
+    return done
+
+def run_batch(records: Iterable[Dict[str, str]], out: TextIO, prefetch: int = BATCH_PREFETCH,
+              skip: Set[str] = frozenset()) -> Dict[str, Any]:
+    """
+    Execute records in order, planning up to `prefetch` instructions ahead.
+    Grounded plans depend on the screen at execution time and are never prefetched.
+    """
+    prefetch = 0 if ENABLE_GROUNDED_PLANNING else prefetch
+    source = (r for r in records if r["id"] not in skip)
+    pending = deque()
+    results = []
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(1, prefetch), thread_name_prefix="plan-prefetch") as pool:
+        def fill():
+            # The instruction being executed has left pending, so this plans `prefetch` ahead of it
+            while len(pending) < max(1, prefetch):
+                record = next(source, None)
+                if record is None:
+                    return
+                future = pool.submit(plan_instruction, record["instruction"], False) if prefetch else None
+                pending.append((record, future))
+
+        try:
+            fill()
+            while pending:
+                record, future = pending.popleft()
+                fill()
+                print(f"[{record['id']}] {record['instruction']}")
+                try:
+                    result = run_instruction(record["instruction"], future.result() if future else None)
+                except Exception as e:
+                    logger.exception("Instruction %s failed: %s", record["id"], e)
+                    result = {"success": False, "failure": f"error: {e}"}
+                row = {"id": record["id"], "instruction": record["instruction"], "ts": round(time.time(), 3),
+                       **{k: result.get(k) for k in RESULT_FIELDS}}
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                out.flush()
+                results.append(row)
+        except KeyboardInterrupt:
+            print("\nInterrupted; rerun with --resume to continue.")
+            for _, future in pending:
+                if future:
+                    future.cancel()
+
+    return summarize_results(results, time.perf_counter() - start)
+
+def summarize_results(results: list, wall_s: float) -> Dict[str, Any]:
+    totals = [r["total_ms"] for r in results if r.get("total_ms") is not None]
+    succeeded = sum(1 for r in results if r.get("success"))
+    return {
+        "instructions": len(results),
+        "succeeded": succeeded,
+        "success_rate": succeeded / len(results) if results else 0.0,
+        "wall_s": wall_s,
+        "instructions_per_min": len(results) / wall_s * 60 if wall_s else 0.0,
+        "p50_ms": percentile(totals, 50),
+        "p95_ms": percentile(totals, 95),
+        "p99_ms": percentile(totals, 99),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file of instructions, or - for stdin")
+    parser.add_argument("--output", help=f"result JSONL (default: <input>.results.jsonl or {os.path.basename(BATCH_RESULTS_FILE)})")
+    parser.add_argument("--resume", action="store_true", help="skip instructions already in the output and append")
+    parser.add_argument("--prefetch", type=int, default=BATCH_PREFETCH, help="plans made ahead of execution")
+    args = parser.parse_args(argv)
+
+    output = args.output or (BATCH_RESULTS_FILE if args.input == "-" else os.path.splitext(args.input)[0] + ".results.jsonl")
+    skip = completed_ids(output) if args.resume else set()
+    if skip:
+        print(f"Resuming: {len(skip)} instructions already recorded in {output}")
+    start_metrics_server()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    try:
+        with open(output, "a" if args.resume else "w", encoding="utf-8") as out:
+            summary = run_batch(iter_instructions(source), out, args.prefetch, skip)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    print("=" * 60)
+    print(f"{summary['instructions']} instructions, {summary['succeeded']} succeeded "
+          f"({summary['success_rate']:.0%}) in {summary['wall_s']:.1f}s "
+          f"= {summary['instructions_per_min']:.1f}/min")
+    print(f"latency p50 {summary['p50_ms']:.0f} ms  p95 {summary['p95_ms']:.0f} ms  p99 {summary['p99_ms']:.0f} ms")
+    print(f"Results: {output}")
+    return summary
+
+if __name__ == "__main__":
+    main()
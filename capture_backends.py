@@ -0,0 +1,199 @@
+"""
+Pluggable screen-capture backends used by screen_parser.capture_screen.
+
+Every backend returns frames as RGB uint8 NumPy arrays of shape (height, width, 3).
+Backends may hand back a reused buffer: a frame is only valid until the next grab,
+so copy it if it must outlive that.
+"""
+import time
+import logging
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pyautogui
+from config import CAPTURE_BACKEND
+
+# Optional: native capture (Xlib on Linux, BitBlt on Windows, CoreGraphics on macOS)
+try:
+    import mss
+except:
+    mss = None
+
+logger = logging.getLogger(__name__)
+
+Region = Tuple[int, int, int, int]  # (left, top, width, height), as used by pyautogui
+
+
+class CaptureBackend:
+    """Base interface: report the capturable area and grab RGB frames."""
+    name = "base"
+
+    def bounds(self) -> Region:
+        raise NotImplementedError
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend(CaptureBackend):
+    """Portable fallback; builds a new PIL image (and array) on every call."""
+    name = "pyautogui"
+
+    def bounds(self) -> Region:
+        screen_w, screen_h = pyautogui.size()
+        return 0, 0, screen_w, screen_h
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        screenshot = pyautogui.screenshot(region=region) if region else pyautogui.screenshot()
+        return np.asarray(screenshot.convert("RGB"))
+
+
+class MSSBackend(CaptureBackend):
+    """
+    Native capture via mss, converted into a preallocated RGB buffer per frame
+    size. mss itself still allocates a full-frame BGRA bytearray (shot.raw) on
+    every grab; only the conversion and the returned array are allocation-free.
+    mss handles are thread-bound: use one backend instance per thread.
+    """
+    name = "mss"
+
+    def __init__(self):
+        if mss is None:
+            raise RuntimeError("mss not installed. Install with: pip install mss")
+        self._sct = mss.mss()
+        self._buffers: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def bounds(self) -> Region:
+        # monitors[0] is the virtual screen spanning all monitors
+        mon = self._sct.monitors[0]
+        return mon["left"], mon["top"], mon["width"], mon["height"]
+
+    def _buffer(self, height: int, width: int) -> np.ndarray:
+        buf = self._buffers.get((height, width))
+        if buf is None:
+            buf = self._buffers[(height, width)] = np.empty((height, width, 3), dtype=np.uint8)
+        return buf
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        if region:
+            left, top, width, height = region
+            monitor = {"left": int(left), "top": int(top), "width": int(width), "height": int(height)}
+        else:
+            monitor = self._sct.monitors[0]
+        shot = self._sct.grab(monitor)
+        raw = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)  # BGRA view
+        buf = self._buffer(shot.height, shot.width)
+        # Channel-wise assignment swaps BGRA -> RGB without temporary arrays
+        buf[..., 0] = raw[..., 2]
+        buf[..., 1] = raw[..., 1]
+        buf[..., 2] = raw[..., 0]
+        return buf
+
+    def close(self):
+        self._sct.close()
+
+
+class FakeBackend(CaptureBackend):
+    """In-memory backend for tests: cycles through the given frames."""
+    name = "fake"
+
+    def __init__(self, frames: List[np.ndarray] = None, size: Tuple[int, int] = (1920, 1080)):
+        if not frames:
+            width, height = size
+            frames = [np.zeros((height, width, 3), dtype=np.uint8)]
+        self.frames = frames
+        self.grabs = 0
+        height, width = frames[0].shape[:2]
+        self._buffer = np.empty((height, width, 3), dtype=np.uint8)
+
+    def bounds(self) -> Region:
+        height, width = self.frames[0].shape[:2]
+        return 0, 0, width, height
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        frame = self.frames[self.grabs % len(self.frames)]
+        self.grabs += 1
+        np.copyto(self._buffer, frame)
+        if region:
+            left, top, width, height = region
+            return self._buffer[top:top + height, left:left + width]
+        return self._buffer
+
+
+BACKENDS = {
+    "mss": MSSBackend,
+    "pyautogui": PyAutoGUIBackend,
+    "fake": FakeBackend,
+}
+
+_backend: Optional[CaptureBackend] = None
+
+def get_backend() -> CaptureBackend:
+    """Return the configured backend ("auto" prefers mss when it is installed)."""
+    global _backend
+    if _backend is None:
+        name = CAPTURE_BACKEND
+        if name == "auto":
+            name = "mss" if mss is not None else "pyautogui"
+        _backend = BACKENDS[name]()
+        logger.info("Capture backend: %s", _backend.name)
+    return _backend
+
+def set_backend(backend: CaptureBackend):
+    """Replace the active backend (e.g. with a FakeBackend in tests)."""
+    global _backend
+    if _backend is not None and _backend is not backend:
+        _backend.close()
+    _backend = backend
+
+# ---------------- Benchmark ---------------- #
+
+def benchmark_backend(backend: CaptureBackend, frames: int = 60, region: Optional[Region] = None) -> Dict[str, float]:
+    """Measure frames per second and bytes allocated per frame for one backend."""
+    backend.grab(region)  # warm up: buffers are allocated on the first grab
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        backend.grab(region)
+    elapsed = time.perf_counter() - start
+
+    # Allocation is measured in a separate pass since tracemalloc slows capture down
+    tracemalloc.start()
+    allocated = 0
+    try:
+        for _ in range(frames):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            backend.grab(region)
+            _, peak = tracemalloc.get_traced_memory()
+            allocated += peak - before
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "backend": backend.name,
+        "frames": frames,
+        "fps": frames / elapsed if elapsed else float("inf"),
+        "alloc_bytes_per_frame": allocated / frames,
+    }
+
+def benchmark_backends(frames: int = 60, region: Optional[Region] = None) -> List[Dict[str, float]]:
+    results = []
+    for name, cls in BACKENDS.items():
+        try:
+            backend = cls()
+        except Exception as e:
+            logger.warning("Skipping capture backend %s: %s", name, e)
+            continue
+        try:
+            results.append(benchmark_backend(backend, frames, region))
+        finally:
+            backend.close()
+    return results
+
+if __name__ == "__main__":
+    for r in benchmark_backends():
+        print(f"{r['backend']:>10}: {r['fps']:8.1f} fps, {r['alloc_bytes_per_frame'] / 1024:10.1f} KiB allocated/frame")
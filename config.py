@@ -20,3 +20,95 @@ ENABLE_CAPTION_MODEL = True
 CAPTION_BOX_EXPAND_PX = 5
 OCR_MIN_TEXT_SIZE = 10
 
+
+# Region-of-interest capture
+ENABLE_ROI_CAPTURE = True  # capture/parse only the active window when possible
+ROI_MIN_SIZE_PX = 50  # ignore minimized or degenerate windows
+
+# Screen capture backend: "auto" (mss if installed, else pyautogui), "mss", "pyautogui" or "fake"
+CAPTURE_BACKEND = "auto"
+
+# Logging: structured JSONL events, written asynchronously with rotation
+LOG_FILE = os.path.join(BASE_DIR, "agent_events.jsonl")
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_ROTATE_WHEN = None  # e.g. "midnight" for time-based instead of size-based rotation
+
+# Screenshot store: content-addressed, deduplicated, evicted by age and total size
+SCREENSHOT_FORMAT = "png"  # or "webp" (lossless, smaller)
+SCREENSHOT_MAX_AGE_DAYS = 7
+SCREENSHOT_MAX_BYTES = 512 * 1024 * 1024
+SCREENSHOT_RETENTION_EVERY = 50  # run eviction after this many stored frames
+
+# Text entry
+TEXT_PASTE_MIN_CHARS = 16  # paste strings at least this long (and any non-ASCII string)
+TEXT_BURST_CHARS = 32  # keystrokes per burst for short strings
+TEXT_BURST_GAP_S = 0.01
+TEXT_KEY_INTERVAL_S = 0.02  # per-key typing for fields that block paste
+TEXT_PASTE_SETTLE_S = 0.05
+TEXT_VERIFY = False  # read the field back after typing (select all + copy); needed to detect paste-blocking fields
+
+# Input injection and settle waits
+INPUT_EVENT_GAP_S = 0.01  # gap between injected input events
+UI_SETTLE_S = 1.0  # before a screen-reading step that follows other input
+LOAD_SETTLE_S = 5.0  # after open/navigate, before the next step
+WAIT_DEFAULT_S = 2.0  # wait steps without a duration, e.g. "wait for results"
+
+# Element-location memory: remembered click targets confirmed by local template matching
+ENABLE_LOCATION_MEMORY = True
+LOCATION_MEMORY_FILE = os.path.join(BASE_DIR, "location_memory.json")
+LOCATION_MATCH_THRESHOLD = 0.9  # normalized cross-correlation needed to trust a remembered box
+LOCATION_SEARCH_MARGIN_PX = 40  # neighborhood searched around the remembered box
+LOCATION_TEMPLATE_MAX_PX = 96  # templates are at most this many pixels per side
+
+# App launch registry
+APP_INDEX_FILE = os.path.join(BASE_DIR, "app_index.json")
+APP_INDEX_TTL_S = 24 * 3600  # rebuild the executable index after this long
+APP_INDEX_MAX_DEPTH = 3  # directory depth scanned under install locations
+PROCESS_REFRESH_S = 1.0  # minimum interval between process table refreshes
+
+# Tiled parsing for high-resolution / multi-monitor frames
+OMNISERVER_ENDPOINTS = [f"{OMNISERVER_BASE_URL}{OMNISERVER_PARSE_PATH}"]  # pool of parser servers for tiles
+# Off by default: tiles only pay off when several servers parse them in parallel (a single
+# server just queues them); measure with `python tiled_parser.py <screenshot>` before enabling
+ENABLE_TILED_PARSE = False
+TILED_PARSE_MIN_PIXELS = 2560 * 1440  # frames at least this large are split into tiles
+TILE_SIZE_PX = 1280
+TILE_OVERLAP_PX = 128  # elements cut by one tile edge appear whole in the neighbor
+TILE_MERGE_IOU = 0.5  # cross-tile duplicates above this IoU (or mostly contained) are merged
+TILE_WORKERS_PER_ENDPOINT = 2
+
+# Adaptive parsing: OCR-only pass first, full SOM + captions only when the target is not matched
+ENABLE_ADAPTIVE_PARSE = True
+FAST_PARSE_MATCH_THRESHOLD = 0.85
+FAST_PARSE_OVERRIDES = {"use_caption_model": False, "som_max_det": 0}  # no icon detection, no captions
+
+# Grounded planning: send the planner a compact digest of the current screen
+ENABLE_GROUNDED_PLANNING = False
+DIGEST_TOKEN_BUDGET = 600  # approximate tokens for the screen digest
+DIGEST_TEXT_CHARS = 32  # element text is truncated to this length
+
+# Planner providers: routed by observed latency, hedged past p95, failed over on error
+PLANNER_PROVIDERS = [
+    {"name": "groq", "base_url": GROQ_BASE_URL, "api_key": GROQ_API_KEY, "model": GROQ_MODEL},
+]
+PLANNER_TIMEOUT_S = 15
+PLANNER_HEDGE_DEFAULT_S = 3.0  # hedge delay until a provider has enough latency samples
+PLANNER_LATENCY_WINDOW = 200  # recent latencies kept per provider; small windows let tails set the p95
+PLANNER_MIN_SAMPLES = 10
+PLANNER_ERROR_HALF_LIFE_S = 60.0  # a provider's error rate decays while it gets no traffic, so it is tried again
+
+# Metrics endpoint (Prometheus text format); None disables it
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = None  # e.g. 9464
+
+# Batch mode
+BATCH_PREFETCH = 2  # plans made ahead of the instruction being executed
+BATCH_RESULTS_FILE = os.path.join(BASE_DIR, "batch_results.jsonl")  # default output when reading stdin
+
+# Opt-in profiling of selected instructions (CPU samples + tracemalloc per phase)
+PROFILE_INSTRUCTIONS = None  # regex; matching instructions are always profiled, e.g. r"chrome|search"
+PROFILE_SAMPLE_RATE = 0.0  # fraction of other instructions profiled
+PROFILE_INTERVAL_S = 0.005  # CPU sampling interval
+PROFILE_TOP_ALLOCATIONS = 20  # allocation sites listed per phase
+PROFILE_TRACEMALLOC_FRAMES = 1  # traceback depth kept by tracemalloc
@@ -0,0 +1,98 @@
+"""
+Asynchronous structured logging for the agent.
+
+Records are handed to a queue on the calling thread and formatted/written by a
+background QueueListener, so the hot path never blocks on file I/O. The file
+receives one JSON object per line with rotation; structured events emitted via
+log_event() carry their fields alongside the message.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from typing import Any, Optional
+from config import LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_WHEN
+
+logger = logging.getLogger("agent.events")
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as a single JSON line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        event = getattr(record, "event", None)
+        if event:
+            entry["event"] = event
+            entry.update(getattr(record, "fields", {}))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that defers message formatting to the listener thread.
+    The stock handler formats on the caller thread; only tracebacks are rendered
+    eagerly here since they reference live frames.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class _NoEvents(logging.Filter):
+    """Keep structured events out of the console; they only go to the JSONL file."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not getattr(record, "event", None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_logging(log_path: str = LOG_FILE, level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """Route all logging through a background listener writing rotated JSONL plus console text."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    if LOG_ROTATE_WHEN:
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            log_path, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+    file_handler.setFormatter(JsonFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    console_handler.addFilter(_NoEvents())
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [_LazyQueueHandler(log_queue)]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+def shutdown_logging():
+    """Flush queued records and stop the background listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def log_event(event: str, **fields: Any):
+    """Emit a structured event (instruction, plan, step, outcome, ...)."""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(event, extra={"event": event, "fields": fields})
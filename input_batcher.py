@@ -0,0 +1,122 @@
+"""
+Input-injection batching for a plan.
+
+Consecutive keyboard steps (hotkey/press/type) are injected as one sequence with
+minimal gaps between events, and settle waits are only inserted before steps that
+need fresh screen state: steps that read the screen (click) and the first step
+after an app or page was opened.
+"""
+import time
+import logging
+from typing import Any, Dict, List
+import pyautogui
+from config import INPUT_EVENT_GAP_S, UI_SETTLE_S, LOAD_SETTLE_S
+from text_entry import enter_text
+from metrics import PHASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+KEYBOARD_ACTIONS = {"hotkey", "press", "type"}
+SCREEN_ACTIONS = {"click"}  # consume ui_elements, so need an up-to-date screen
+LOADING_ACTIONS = {"open", "navigate"}  # leave the UI busy until the app/page is ready
+
+def split_keys(keys: str) -> List[str]:
+    return [k.strip().lower() for k in keys.replace("+", " ").split() if k.strip()]
+
+def coalesce_plan(actions: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Group a plan into runs of consecutive keyboard steps and single non-keyboard
+    steps. A step with a settle time (a folded wait) starts a new run, since
+    waits are only applied before a group's first step.
+    """
+    groups: List[List[Dict[str, Any]]] = []
+    for action in actions:
+        is_keyboard = action.get("action") in KEYBOARD_ACTIONS
+        if (is_keyboard and not action.get("settle") and groups
+                and groups[-1][0].get("action") in KEYBOARD_ACTIONS):
+            groups[-1].append(action)
+        else:
+            groups.append([action])
+    return groups
+
+def settle_before(previous: List[Dict[str, Any]], action: Dict[str, Any]) -> float:
+    """
+    Seconds to wait before `action`, given the steps executed since the last
+    settle; an explicit "settle" on the step (folded wait steps) is a lower bound.
+    """
+    wait = action.get("settle", 0.0)
+    if any(a.get("action") in LOADING_ACTIONS for a in previous):
+        return max(wait, LOAD_SETTLE_S)
+    if action.get("action") in SCREEN_ACTIONS and previous:
+        return max(wait, UI_SETTLE_S)
+    return wait
+
+class PlanInjector:
+    """Injects keyboard runs and accounts for injected events and idle time per plan."""
+
+    def __init__(self):
+        self.events = 0
+        self.inject_seconds = 0.0
+        self.idle_seconds = 0.0
+
+    def settle(self, seconds: float):
+        if seconds > 0:
+            start = time.perf_counter()
+            time.sleep(seconds)
+            self.idle_seconds += time.perf_counter() - start
+
+    def _gap(self):
+        self.settle(INPUT_EVENT_GAP_S)
+
+    def _inject(self, action: Dict[str, Any]) -> bool:
+        kind = action.get("action")
+        target = action.get("target") or ""
+        if kind == "hotkey":
+            keys = split_keys(action.get("keys") or "")
+            if not keys:
+                return False
+            pyautogui.hotkey(*keys, _pause=False)
+            self.events += 2 * len(keys)
+            return True
+        if kind == "press":
+            key = (action.get("keys") or target).strip().lower()
+            if not key:
+                return False
+            pyautogui.press(key, _pause=False)
+            self.events += 2
+            return True
+        if kind == "type":
+            if target.lower() in ["address bar", "url bar"]:
+                pyautogui.hotkey("ctrl", "l", _pause=False)
+                self.events += 4
+                self._gap()
+            text = action.get("text") or ""
+            self.events += 2 * len(text)
+            return enter_text(text, field=target)
+        return False
+
+    def run_keyboard(self, run: List[Dict[str, Any]]) -> int:
+        """Inject a keyboard run; returns how many steps succeeded before the first failure."""
+        start = time.perf_counter()
+        idle_before = self.idle_seconds
+        done = 0
+        try:
+            for i, action in enumerate(run):
+                if i:
+                    self._gap()
+                if not self._inject(action):
+                    break
+                done += 1
+        except Exception as e:
+            logger.error("Keyboard injection failed at step %d of run: %s", done + 1, e)
+        inject_seconds = time.perf_counter() - start - (self.idle_seconds - idle_before)
+        self.inject_seconds += inject_seconds
+        PHASE_SECONDS.observe(inject_seconds, phase="inject")
+        return done
+
+    def report(self) -> Dict[str, float]:
+        return {
+            "injected_events": self.events,
+            "events_per_s": self.events / self.inject_seconds if self.inject_seconds else 0.0,
+            "idle_ms": self.idle_seconds * 1000,
+        }
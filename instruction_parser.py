@@ -1,8 +1,14 @@
 import json
-import requests
 import re
 import logging
-from config import GROQ_API_KEY, GROQ_MODEL, GROQ_BASE_URL
+from typing import Any, Dict, List, Optional, Set, Tuple
+from config import (
+    ENABLE_GROUNDED_PLANNING,
+    DIGEST_TOKEN_BUDGET,
+    DIGEST_TEXT_CHARS,
+)
+from planner_client import get_planner_client
+from metrics import PHASE_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -30,32 +36,135 @@ Rules:
 - Return ONLY JSON, no explanations.
 """
 
-def parse_instruction_with_llm(instruction):
-    """Parse user instruction using Groq LLM API."""
-    user_message = f"Parse this instruction: '{instruction}'"
+# Appended to SYSTEM_PROMPT unchanged so the whole system prompt stays a cacheable prefix
+GROUNDING_PROMPT = """
+Grounding:
+- The user message may begin with a SCREEN block of visible interactive elements,
+  one per line as: id|type|text|position
+- For a click on a listed element add "element_id": <id> and keep "target" as its text.
+- Only use ids from the SCREEN block; omit element_id for anything not listed.
+"""
+GROUNDED_SYSTEM_PROMPT = SYSTEM_PROMPT + GROUNDING_PROMPT
+
+PLANNER_STATS = {mode: {"requests": 0, "prompt_tokens": 0, "plans": 0, "failed_plans": 0}
+                 for mode in ("blind", "grounded")}
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def _coarse_position(bbox: List[float], extent: Tuple[float, float, float, float]) -> str:
+    left, top, width, height = extent
+    cx = ((bbox[0] + bbox[2]) / 2 - left) / width
+    cy = ((bbox[1] + bbox[3]) / 2 - top) / height
+    row = "top" if cy < 1 / 3 else "middle" if cy < 2 / 3 else "bottom"
+    col = "left" if cx < 1 / 3 else "center" if cx < 2 / 3 else "right"
+    return f"{row}-{col}"
+
+def build_screen_digest(ui_elements: List[Dict[str, Any]], token_budget: int = DIGEST_TOKEN_BUDGET) -> Tuple[str, List[int]]:
+    """
+    Compact, token-budgeted listing of interactive elements for the planner.
+    IDs are indexes into ui_elements; returns the digest and the IDs it includes.
+    """
+    if not ui_elements:
+        return "", []
+    # Coarse positions are relative to the extent of the parsed elements, which
+    # are in screen coordinates and need not start at (0, 0)
+    left = min(el["bbox"][0] for el in ui_elements)
+    top = min(el["bbox"][1] for el in ui_elements)
+    width = (max(el["bbox"][2] for el in ui_elements) - left) or 1
+    height = (max(el["bbox"][3] for el in ui_elements) - top) or 1
+    extent = (left, top, width, height)
+    candidates = [
+        (i, el) for i, el in enumerate(ui_elements)
+        if el.get("interactivity") and (el.get("text") or "").strip()
+    ]
+    # Reading order keeps the digest stable between similar screens
+    candidates.sort(key=lambda item: (round((item[1]["bbox"][1] - top) / height, 1), item[1]["bbox"][0]))
+
+    lines, ids, tokens = [], [], 0
+    for i, el in candidates:
+        text = " ".join(el["text"].split()).replace("|", "/")[:DIGEST_TEXT_CHARS]
+        line = f"{i}|{el.get('type') or 'el'}|{text}|{_coarse_position(el['bbox'], extent)}"
+        cost = _estimate_tokens(line)
+        if tokens + cost > token_budget:
+            break
+        lines.append(line)
+        ids.append(i)
+        tokens += cost
+    return "\n".join(lines), ids
 
-    headers = {"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"}
-    data = {
-        "model": GROQ_MODEL,
-        "messages": [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": user_message}
-        ],
-        "temperature": 0.1,
-        "max_tokens": 500
+def record_plan_outcome(mode: str, success: bool):
+    """Record whether a plan ran through without a failed step (a failure costs a retry)."""
+    PLANNER_STATS[mode]["plans"] += 1
+    PLANNER_STATS[mode]["failed_plans"] += 0 if success else 1
+
+def planner_report() -> Dict[str, Dict[str, float]]:
+    """Prompt tokens per request and retry rate, blind vs grounded planning."""
+    return {
+        mode: {
+            "requests": s["requests"],
+            "prompt_tokens_per_request": s["prompt_tokens"] / s["requests"] if s["requests"] else 0.0,
+            "retry_rate": s["failed_plans"] / s["plans"] if s["plans"] else 0.0,
+        }
+        for mode, s in PLANNER_STATS.items()
     }
 
+def parse_instruction_with_llm(instruction, ui_elements: Optional[List[Dict[str, Any]]] = None):
+    """Parse user instruction with the LLM planner; see plan_with_screen."""
+    return plan_with_screen(instruction, ui_elements)[0]
+
+def _keep_digest_ids(actions: Any, ids: Set[int]) -> Any:
+    """Drop element_ids the planner was not shown (hallucinated, filtered or over budget); target remains."""
+    if not isinstance(actions, list):
+        return actions
+    for step in actions:
+        if isinstance(step, dict) and "element_id" in step:
+            try:
+                shown = int(step["element_id"]) in ids
+            except (TypeError, ValueError):
+                shown = False
+            if not shown:
+                logger.info("Dropping element_id %r not in the screen digest", step.pop("element_id"))
+    return actions
+
+def plan_with_screen(instruction, ui_elements: Optional[List[Dict[str, Any]]] = None) -> Tuple[Any, Set[int]]:
+    """
+    Parse user instruction with the LLM planner (see planner_client). With
+    grounded planning enabled and ui_elements given, the planner sees a digest
+    of the screen and may return element_id references into ui_elements.
+    Returns the steps and the element IDs the digest listed; the plan is
+    grounded only if that set is non-empty, and only those IDs survive.
+    """
+    digest, ids = build_screen_digest(ui_elements) if ENABLE_GROUNDED_PLANNING and ui_elements else ("", [])
+    ids = set(ids)
+    mode = "grounded" if digest else "blind"
+    system_prompt = GROUNDED_SYSTEM_PROMPT if digest else SYSTEM_PROMPT
+    user_message = f"Parse this instruction: '{instruction}'"
+    if digest:
+        user_message = f"SCREEN:\n{digest}\n\n{user_message}"
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+
     try:
-        resp = requests.post(f"{GROQ_BASE_URL}/chat/completions", headers=headers, json=data, timeout=15)
-        if resp.status_code == 200:
-            content = resp.json()["choices"][0]["message"]["content"]
+        with PHASE_SECONDS.time(phase="plan"):
+            answer = get_planner_client().complete(messages, temperature=0.1, max_tokens=500)
+        PLANNER_STATS[mode]["requests"] += 1
+        if answer:
+            body, provider = answer
+            logger.debug("Plan from %s", provider)
+            PLANNER_STATS[mode]["prompt_tokens"] += (body.get("usage") or {}).get(
+                "prompt_tokens", _estimate_tokens(system_prompt + user_message))
+            content = body["choices"][0]["message"]["content"]
             parsed = extract_json_from_response(content)
             if parsed:
-                return parsed
+                return _keep_digest_ids(parsed, ids), ids
     except Exception as e:
-        logger.warning(f"LLM call failed: {e}")
+        logger.warning("LLM call failed: %s", e)
 
-    return parse_instruction_fallback(instruction)
+    return parse_instruction_fallback(instruction), ids
 
 def extract_json_from_response(content):
     try:
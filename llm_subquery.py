@@ -1,36 +1,50 @@
 # llm_subquery_agent.py
 
 import time
-import os
-from instruction_parser import parse_instruction_with_llm
+from instruction_parser import parse_instruction_with_llm, plan_with_screen, record_plan_outcome
 from action_executor import execute_action
-from screen_parser import capture_screen, get_ui_elements
+from plan_optimizer import optimize_plan
+from input_batcher import settle_before
+from screen_parser import capture_and_parse
+from screenshot_store import ScreenshotStore
+from profiling import phase, profile_instruction, session_profile_dir
 
-def execute_subquery(subquery: str, screenshot_dir: str, idx: int):
+def execute_subquery(subquery: str, store: ScreenshotStore, idx: int):
     """
     Executes a single subquery using OmniParser + LLM guidance.
     """
     while True:
         # 1️⃣ Capture fresh screenshot for current UI state
-        screenshot_path = capture_screen(os.path.join(screenshot_dir, f"step_{idx}.png"))
-        ui_elements = get_ui_elements(screenshot_path)
+        with phase("parse"):
+            ui_elements = capture_and_parse(f"subquery_{idx}", store=store)
 
         # 2️⃣ Ask LLM for next actions in this subquery
-        actions = parse_instruction_with_llm(subquery)
+        with phase("plan"):
+            actions, grounded_ids = plan_with_screen(subquery, ui_elements)
         if not actions:
             print(f"No actions returned for subquery: {subquery}")
             break
 
-        # 3️⃣ Execute each action
+        # 3️⃣ Execute each action, settling after open/navigate and before screen-reading steps
+        actions, _ = optimize_plan(actions)
+        since_settle = []
         subquery_complete = True
         for action in actions:
-            success = execute_action(action, ui_elements)
+            wait = settle_before(since_settle, action)
+            if wait:
+                time.sleep(wait)
+                since_settle = []
+            since_settle.append(action)
+            with phase("execute"):
+                success = execute_action(action, ui_elements)
             if not success:
                 print(f"Action failed: {action}, retrying subquery...")
                 subquery_complete = False
                 time.sleep(0.5)
                 break  # retry subquery
 
+        record_plan_outcome("grounded" if grounded_ids else "blind", subquery_complete)
+
         # 4️⃣ Exit loop if subquery completed successfully
         if subquery_complete:
             break
@@ -40,12 +54,21 @@ def execute_instruction(instruction: str, screenshot_dir: str = "screenshots"):
     """
     High-level function to execute a full instruction.
     Splits into subqueries using LLM, then executes each sequentially.
+    Instructions selected for profiling write their profiles next to the
+    session manifest.
     """
-    # Ensure screenshot directory exists
-    os.makedirs(screenshot_dir, exist_ok=True)
+    # Screenshots are stored content-addressed under screenshot_dir
+    store = ScreenshotStore(root=screenshot_dir)
+    try:
+        with profile_instruction(instruction, session_profile_dir(store)):
+            _execute_instruction(instruction, store)
+    finally:
+        store.close()
 
+def _execute_instruction(instruction: str, store: ScreenshotStore):
     # 1️⃣ Use LLM to split instruction into subqueries
-    subqueries = parse_instruction_with_llm(instruction)
+    with phase("plan"):
+        subqueries = parse_instruction_with_llm(instruction)
 
     if not subqueries:
         print("Failed to parse instruction into subqueries.")
@@ -58,6 +81,6 @@ def execute_instruction(instruction: str, screenshot_dir: str = "screenshots"):
     # 2️⃣ Execute each subquery sequentially
     for idx, subquery in enumerate(subqueries, start=1):
         print(f"Executing subquery {idx}/{len(subqueries)}: {subquery}")
-        execute_subquery(subquery, screenshot_dir, idx)
+        execute_subquery(subquery, store, idx)
 
     print("✅ Instruction completed successfully.")
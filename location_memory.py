@@ -0,0 +1,154 @@
+"""
+Persistent element-location memory.
+
+Remembers where a click target was found, keyed by window/site, target text and
+screen resolution, together with a small grayscale pixel template. A later lookup
+grabs only a small neighborhood around the remembered box and confirms the
+target with an OpenCV template match, so a full OmniServer parse is needed
+only on a miss.
+"""
+import os
+import json
+import base64
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import (
+    LOCATION_MEMORY_FILE,
+    LOCATION_MATCH_THRESHOLD,
+    LOCATION_SEARCH_MARGIN_PX,
+    LOCATION_TEMPLATE_MAX_PX,
+)
+from capture_backends import Region, get_backend
+from metrics import CACHE_ENTRIES, CACHE_LOOKUPS
+
+# Optional: template matching
+try:
+    import cv2
+except:
+    cv2 = None
+
+logger = logging.getLogger(__name__)
+
+def _inside(bbox: List[float], region: Region) -> bool:
+    left, top, width, height = region
+    return left <= bbox[0] and top <= bbox[1] and bbox[2] <= left + width and bbox[3] <= top + height
+
+class LocationMemory:
+    def __init__(self, path: str = LOCATION_MEMORY_FILE):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self.stats = {"hits": 0, "misses": 0, "saved_parse_s": 0.0}
+        self._parse_s = 0.0  # moving average of a full parse, credited on each hit
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    @staticmethod
+    def key(context: str, target: str, resolution: Tuple[int, int]) -> str:
+        return f"{(context or '').strip().lower()}|{target.strip().lower()}|{resolution[0]}x{resolution[1]}"
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def record_parse_time(self, seconds: float):
+        self._parse_s = seconds if not self._parse_s else 0.8 * self._parse_s + 0.2 * seconds
+
+    @staticmethod
+    def _grab_gray(region: Region) -> np.ndarray:
+        return cv2.cvtColor(get_backend().grab(region), cv2.COLOR_RGB2GRAY)
+
+    def lookup(self, key: str, region: Optional[Region] = None) -> Optional[List[float]]:
+        """
+        Return the target's current bbox if the remembered template is still nearby
+        (and the remembered box lies inside region, when one is given), else None.
+        """
+        entry = self.entries.get(key)
+        if entry is None or cv2 is None or (region and not _inside(entry["bbox"], region)):
+            self.stats["misses"] += 1
+            CACHE_LOOKUPS.inc(cache="location_memory", result="miss")
+            return None
+        try:
+            template = cv2.imdecode(np.frombuffer(base64.b64decode(entry["template"]), np.uint8), cv2.IMREAD_GRAYSCALE)
+            x1, y1, x2, y2 = entry["bbox"]
+            tx, ty = entry["template_offset"]
+            th, tw = template.shape[:2]
+
+            left = int(x1 + tx) - LOCATION_SEARCH_MARGIN_PX
+            top = int(y1 + ty) - LOCATION_SEARCH_MARGIN_PX
+            window = self._grab_gray((left, top, tw + 2 * LOCATION_SEARCH_MARGIN_PX, th + 2 * LOCATION_SEARCH_MARGIN_PX))
+            if window.shape[0] < th or window.shape[1] < tw:
+                raise ValueError("search window clipped by screen edge")
+
+            scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (mx, my) = cv2.minMaxLoc(scores)
+        except Exception as e:
+            logger.warning("Location memory lookup failed for '%s': %s", key, e)
+            score = 0.0
+
+        if score < LOCATION_MATCH_THRESHOLD:
+            self.stats["misses"] += 1
+            CACHE_LOOKUPS.inc(cache="location_memory", result="miss")
+            return None
+
+        dx, dy = mx - LOCATION_SEARCH_MARGIN_PX, my - LOCATION_SEARCH_MARGIN_PX
+        self.stats["hits"] += 1
+        CACHE_LOOKUPS.inc(cache="location_memory", result="hit")
+        self.stats["saved_parse_s"] += self._parse_s
+        logger.info("Location memory hit for '%s' (score %.2f, shift %d,%d)", key, score, dx, dy)
+        return [x1 + dx, y1 + dy, x2 + dx, y2 + dy]
+
+    def remember(self, key: str, bbox: List[float]):
+        """Store bbox (screen pixels) and a template grabbed from the current screen."""
+        if cv2 is None:
+            return
+        x1, y1, x2, y2 = (int(v) for v in bbox)
+        w, h = x2 - x1, y2 - y1
+        if w < 4 or h < 4:
+            return
+        # Large boxes keep only a centered patch as the template
+        tw, th = min(w, LOCATION_TEMPLATE_MAX_PX), min(h, LOCATION_TEMPLATE_MAX_PX)
+        tx, ty = (w - tw) // 2, (h - th) // 2
+        try:
+            patch = self._grab_gray((x1 + tx, y1 + ty, tw, th))
+            ok, png = cv2.imencode(".png", patch)
+            if not ok:
+                return
+        except Exception as e:
+            logger.warning("Could not grab template for '%s': %s", key, e)
+            return
+
+        with self._lock:
+            self.entries[key] = {
+                "bbox": [x1, y1, x2, y2],
+                "template_offset": [tx, ty],
+                "template": base64.b64encode(png.tobytes()).decode("ascii"),
+            }
+            self._save()
+
+    def forget(self, key: str):
+        """Drop an entry whose remembered click led to a failed step."""
+        with self._lock:
+            if self.entries.pop(key, None) is not None:
+                self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+        CACHE_ENTRIES.set(len(self.entries), cache="location_memory")
+
+_memory: Optional[LocationMemory] = None
+
+def get_location_memory() -> LocationMemory:
+    global _memory
+    if _memory is None:
+        _memory = LocationMemory()
+    return _memory
@@ -0,0 +1,78 @@
+"""
+Aggregate step latencies and failure rates from the agent's JSONL event log.
+
+Usage:
+    python log_query.py [agent_events.jsonl] [--since EPOCH_SECONDS]
+"""
+import argparse
+import glob
+import json
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List
+from config import LOG_FILE
+
+def iter_events(log_path: str = LOG_FILE, since: float = 0.0) -> Iterator[Dict[str, Any]]:
+    """Yield structured events from the log and its rotated siblings."""
+    paths = sorted(glob.glob(log_path + ".*"), reverse=True) + [log_path]
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get("event") and entry.get("ts", 0) >= since:
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+def summarize(events: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-action step latency percentiles and failure rates, plus instruction outcomes."""
+    steps = defaultdict(lambda: {"count": 0, "failures": 0, "latencies": []})
+    outcomes = {"count": 0, "failures": 0, "latencies": []}
+    for e in events:
+        if e["event"] == "step":
+            s = steps[e.get("action") or "unknown"]
+            s["count"] += 1
+            s["failures"] += 0 if e.get("success") else 1
+            s["latencies"].append(e.get("total_ms", 0.0))
+        elif e["event"] == "outcome":
+            outcomes["count"] += 1
+            outcomes["failures"] += 0 if e.get("success") else 1
+            outcomes["latencies"].append(e.get("total_ms", 0.0))
+
+    def _stats(s):
+        return {
+            "count": s["count"],
+            "failure_rate": s["failures"] / s["count"] if s["count"] else 0.0,
+            "p50_ms": percentile(s["latencies"], 50),
+            "p95_ms": percentile(s["latencies"], 95),
+        }
+
+    return {
+        "steps": {action: _stats(s) for action, s in sorted(steps.items())},
+        "instructions": _stats(outcomes),
+    }
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("log_path", nargs="?", default=LOG_FILE)
+    arg_parser.add_argument("--since", type=float, default=0.0, help="only events at or after this epoch time")
+    args = arg_parser.parse_args()
+
+    summary = summarize(iter_events(args.log_path, args.since))
+    print(f"{'action':<12}{'count':>8}{'fail %':>9}{'p50 ms':>10}{'p95 ms':>10}")
+    rows = list(summary["steps"].items()) + [("INSTRUCTION", summary["instructions"])]
+    for name, s in rows:
+        print(f"{name:<12}{s['count']:>8}{s['failure_rate'] * 100:>8.1f}%{s['p50_ms']:>10.0f}{s['p95_ms']:>10.0f}")
+
+if __name__ == "__main__":
+    main()
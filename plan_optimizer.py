@@ -0,0 +1,139 @@
+"""
+Plan optimization between parse_instruction_with_llm and execution.
+
+Normalizes LLM step variants, drops redundant steps, folds wait steps into a
+settle time on the following step (a trailing wait stays as a settle-only step),
+and marks which steps need a fresh screen parse (only steps that consume
+ui_elements).
+"""
+import re
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from config import WAIT_DEFAULT_S, LOAD_SETTLE_S
+
+logger = logging.getLogger(__name__)
+
+ACTION_ALIASES = {
+    "key": "press", "keypress": "press", "press_key": "press",
+    "goto": "navigate", "go_to": "navigate", "visit": "navigate", "browse": "navigate",
+    "launch": "open", "start": "open", "open_app": "open",
+    "input": "type", "write": "type", "type_text": "type",
+    "sleep": "wait", "pause": "wait",
+}
+PARSE_ACTIONS = {"click"}  # steps whose execution reads ui_elements
+IDEMPOTENT_ACTIONS = {"open", "navigate"}  # repeating these back to back has no effect
+# Browser focus/new-tab hotkeys that navigate makes redundant
+NAVIGATE_PREAMBLE_KEYS = {"ctrl+t", "ctrl+l", "alt+d", "f6", "command+t", "command+l"}
+
+def _norm_keys(keys: str) -> str:
+    return "+".join(k.strip().lower() for k in re.split(r"[+\s]+", keys or "") if k.strip())
+
+def _wait_seconds(step: Dict[str, Any]) -> float:
+    """Explicit duration of a wait step ("5", "5 seconds"), else a settle time inferred from its description."""
+    for key in ("seconds", "duration", "time", "target", "text"):
+        value = step.get(key)
+        if isinstance(value, (int, float)):
+            return float(value)
+        match = re.match(r"\s*(\d+(?:\.\d+)?)", str(value or ""))
+        if match:
+            return float(match.group(1))
+    description = " ".join(str(step.get(k) or "") for k in ("target", "text")).lower()
+    return LOAD_SETTLE_S if "load" in description else WAIT_DEFAULT_S
+
+def normalize_step(step: Any) -> Optional[Dict[str, Any]]:
+    """Canonicalize one step; returns None for steps that do nothing."""
+    if not isinstance(step, dict):
+        return None
+    step = dict(step)
+    action = str(step.get("action") or "").strip().lower().replace(" ", "_")
+    action = ACTION_ALIASES.get(action, action)
+    step["action"] = action
+
+    if action == "hotkey":
+        keys = _norm_keys(step.get("keys") or step.get("target") or "")
+        if not keys:
+            return None
+        if "+" not in keys:
+            # A single key is a press, e.g. {"action": "hotkey", "keys": "enter"}
+            return {"action": "press", "target": keys}
+        step["keys"] = keys
+        step.pop("target", None)
+    elif action == "press":
+        key = _norm_keys(step.get("target") or step.get("keys") or "")
+        if not key:
+            return None
+        if "+" in key:
+            return {"action": "hotkey", "keys": key}
+        step["target"] = key
+        step.pop("keys", None)
+    elif action == "type":
+        if not step.get("text"):
+            return None
+    elif action in ("click", "open", "navigate"):
+        if "element_id" in step:
+            try:
+                step["element_id"] = int(step["element_id"])
+            except (TypeError, ValueError):
+                step.pop("element_id")
+        if not str(step.get("target") or "").strip() and "element_id" not in step:
+            return None
+    return step
+
+def optimize_plan(actions: List[Any]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Return the optimized plan and a report of steps and screen parses saved.
+    Surviving steps may carry "settle" (seconds to wait first) and always carry
+    "needs_parse".
+    """
+    actions = actions or []
+    steps: List[Dict[str, Any]] = []
+    pending_settle = 0.0
+
+    for raw in actions:
+        step = normalize_step(raw)
+        if step is None:
+            continue
+        action = step["action"]
+
+        if action == "wait":
+            pending_settle = max(pending_settle, _wait_seconds(step))
+            continue
+
+        if action == "navigate":
+            # Drop new-tab/focus-address-bar hotkeys right before a navigate
+            while steps and steps[-1]["action"] == "hotkey" and steps[-1]["keys"] in NAVIGATE_PREAMBLE_KEYS:
+                dropped = steps.pop()
+                pending_settle = max(pending_settle, dropped.get("settle", 0.0))
+
+        if steps and action in IDEMPOTENT_ACTIONS and all(
+            steps[-1].get(k) == step.get(k) for k in ("action", "target")
+        ):
+            continue
+
+        if pending_settle:
+            step["settle"] = max(step.get("settle", 0.0), pending_settle)
+            pending_settle = 0.0
+        step["needs_parse"] = action in PARSE_ACTIONS
+        steps.append(step)
+
+    if pending_settle:
+        # A trailing wait has no step to settle before; keep it as a step that only settles,
+        # so e.g. the next batch instruction does not start early
+        steps.append({"action": "wait", "settle": pending_settle, "needs_parse": False})
+
+    # Previously every click/open/navigate step triggered a capture + parse
+    parses_before = sum(
+        1 for a in actions if isinstance(a, dict) and str(a.get("action") or "").lower() in ("click", "open", "navigate")
+    )
+    parses_after = sum(1 for s in steps if s["needs_parse"])
+    report = {
+        "steps_in": len(actions),
+        "steps_out": len(steps),
+        "steps_saved": len(actions) - len(steps),
+        "parses_before": parses_before,
+        "parses_after": parses_after,
+        "parses_saved": parses_before - parses_after,
+    }
+    logger.info("Plan optimized: %d -> %d steps, %d parses saved",
+                report["steps_in"], report["steps_out"], report["parses_saved"])
+    return steps, report
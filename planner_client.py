@@ -0,0 +1,248 @@
+"""
+Planner client with latency-based provider routing, hedging and failover.
+
+Providers are ranked by observed latency and error rate; the error rate decays
+over time, so a provider demoted by errors is eventually tried again. A request
+goes to the best provider; if it has not answered within that provider's rolling p95
+latency, a hedged duplicate goes to the next one, and the first successful
+answer wins. A failed request fails over to the next provider immediately.
+"""
+import json
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import requests
+from config import (
+    PLANNER_PROVIDERS,
+    PLANNER_TIMEOUT_S,
+    PLANNER_HEDGE_DEFAULT_S,
+    PLANNER_LATENCY_WINDOW,
+    PLANNER_MIN_SAMPLES,
+    PLANNER_ERROR_HALF_LIFE_S,
+)
+from metrics import PLANNER_REQUEST_SECONDS, RETRIES
+
+logger = logging.getLogger(__name__)
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+class Provider:
+    def __init__(self, name: str, base_url: str, api_key: str = "", model: str = "", timeout: float = PLANNER_TIMEOUT_S):
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.latencies = deque(maxlen=PLANNER_LATENCY_WINDOW)
+        self._error_rate = 0.0  # exponentially weighted per request, halved every PLANNER_ERROR_HALF_LIFE_S
+        self._error_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _decayed_error_rate(self, now: float) -> float:
+        return self._error_rate * 0.5 ** ((now - self._error_time) / PLANNER_ERROR_HALF_LIFE_S)
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return self._decayed_error_rate(time.monotonic())
+
+    def record(self, ok: bool, latency: float):
+        PLANNER_REQUEST_SECONDS.observe(latency, provider=self.name, result="ok" if ok else "error")
+        with self._lock:
+            if ok:
+                self.latencies.append(latency)
+            now = time.monotonic()
+            self._error_rate = 0.8 * self._decayed_error_rate(now) + 0.2 * (0.0 if ok else 1.0)
+            self._error_time = now
+
+    def hedge_delay(self) -> float:
+        """Rolling p95 latency, or a default until enough samples exist."""
+        with self._lock:
+            if len(self.latencies) < PLANNER_MIN_SAMPLES:
+                return PLANNER_HEDGE_DEFAULT_S
+            return _percentile(list(self.latencies), 95)
+
+    def score(self) -> float:
+        """Lower is better: median latency inflated by the recent error rate."""
+        with self._lock:
+            median = _percentile(list(self.latencies), 50) if self.latencies else PLANNER_HEDGE_DEFAULT_S
+            return median * (1 + 4 * self._decayed_error_rate(time.monotonic()))
+
+    def request(self, messages: List[Dict[str, str]], **params) -> Dict[str, Any]:
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        data = {"model": self.model, "messages": messages, **params}
+        start = time.perf_counter()
+        try:
+            resp = requests.post(f"{self.base_url}/chat/completions", headers=headers, json=data, timeout=self.timeout)
+            if resp.status_code != 200:
+                raise RuntimeError(f"{self.name} returned {resp.status_code}")
+            body = resp.json()
+        except Exception:
+            self.record(False, time.perf_counter() - start)
+            raise
+        self.record(True, time.perf_counter() - start)
+        return body
+
+class PlannerClient:
+    def __init__(self, providers: List[Provider] = None, hedge: bool = True):
+        self.providers = providers or [Provider(**p) for p in PLANNER_PROVIDERS]
+        self.hedge = hedge
+        self._executor = ThreadPoolExecutor(max_workers=2 * len(self.providers), thread_name_prefix="planner")
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0, "failures": 0}
+        self.latencies = deque(maxlen=1000)
+        self._lock = threading.Lock()  # complete() runs concurrently from batch prefetch threads
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = dict.fromkeys(self.stats, 0)
+            self.latencies.clear()
+
+    def ranked(self) -> List[Provider]:
+        return sorted(self.providers, key=lambda p: p.score())
+
+    def complete(self, messages: List[Dict[str, str]], **params) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Return (response body, provider name) from the first provider to answer, or None."""
+        self._count("requests")
+        start = time.perf_counter()
+        queue = self.ranked()
+        primary = queue.pop(0)
+        pending: Dict[Future, Provider] = {self._executor.submit(primary.request, messages, **params): primary}
+        hedge_at = start + primary.hedge_delay() if self.hedge and queue else None
+        deadline = start + PLANNER_TIMEOUT_S
+        hedged = False
+
+        while pending:
+            now = time.perf_counter()
+            wake = min(t for t in (hedge_at, deadline) if t is not None)
+            done, _ = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+
+            if not done:
+                if hedge_at is not None and time.perf_counter() >= hedge_at:
+                    backup = queue.pop(0)
+                    logger.info("Planner %s slower than p95 (%.2fs), hedging to %s",
+                                primary.name, hedge_at - start, backup.name)
+                    pending[self._executor.submit(backup.request, messages, **params)] = backup
+                    self._count("hedged")
+                    RETRIES.inc(kind="planner_hedge")
+                    hedged = True
+                    hedge_at = None
+                    continue
+                if time.perf_counter() >= deadline:
+                    break
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    body = future.result()
+                except Exception as e:
+                    logger.warning("Planner %s failed: %s", provider.name, e)
+                    if queue and not pending:
+                        backup = queue.pop(0)
+                        pending[self._executor.submit(backup.request, messages, **params)] = backup
+                        self._count("failovers")
+                        RETRIES.inc(kind="planner_failover")
+                        hedge_at = None
+                    continue
+                # The losing request cannot be interrupted mid-flight; its late answer is discarded
+                for other in pending:
+                    other.cancel()
+                if hedged and provider is not primary:
+                    self._count("hedge_wins")
+                with self._lock:
+                    self.latencies.append(time.perf_counter() - start)
+                return body, provider.name
+
+        self._count("failures")
+        return None
+
+    def report(self) -> Dict[str, float]:
+        with self._lock:
+            stats, latencies = dict(self.stats), list(self.latencies)
+        return {
+            **stats,
+            "hedge_rate": stats["hedged"] / stats["requests"] if stats["requests"] else 0.0,
+            "p50_s": _percentile(latencies, 50) if latencies else 0.0,
+            "p95_s": _percentile(latencies, 95) if latencies else 0.0,
+            "p99_s": _percentile(latencies, 99) if latencies else 0.0,
+        }
+
+_client: Optional[PlannerClient] = None
+
+def get_planner_client() -> PlannerClient:
+    global _client
+    if _client is None:
+        _client = PlannerClient()
+    return _client
+
+# ---------------- Mock endpoints for testing ---------------- #
+
+def start_mock_provider(delay_s: Union[float, Callable[[], float]] = 0.0, fail_rate: float = 0.0,
+                        content: str = '[{"action": "open", "target": "notepad"}]') -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Serve an OpenAI-style /chat/completions endpoint on localhost that waits
+    delay_s (a number, or a callable for injected tail latency) before answering.
+    Returns the server (call .shutdown() when done) and its base URL.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay_s() if callable(delay_s) else delay_s)
+            if random.random() < fail_rate:
+                self.send_response(500)
+                self.end_headers()
+                return
+            body = json.dumps({"choices": [{"message": {"content": content}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def benchmark_hedging(requests_count: int = 200, tail_prob: float = 0.03, tail_s: float = 2.0,
+                      base_s: float = 0.05) -> Dict[str, Dict[str, float]]:
+    """
+    Tail latency and hedge rate with and without hedging against two mock
+    providers with injected tails. Warm-up requests that fill the latency
+    windows are not counted.
+    """
+    delay = lambda: tail_s if random.random() < tail_prob else base_s
+    servers = [start_mock_provider(delay) for _ in range(2)]
+    results = {}
+    try:
+        for hedge in (False, True):
+            providers = [Provider(f"mock{i}", url) for i, (_, url) in enumerate(servers)]
+            client = PlannerClient(providers, hedge=hedge)
+            for _ in range(2 * PLANNER_MIN_SAMPLES):
+                client.complete([{"role": "user", "content": "ping"}])
+            client.reset_stats()
+            for _ in range(requests_count):
+                client.complete([{"role": "user", "content": "ping"}])
+            results["hedged" if hedge else "single"] = client.report()
+    finally:
+        for server, _ in servers:
+            server.shutdown()
+    return results
+
+if __name__ == "__main__":
+    for mode, r in benchmark_hedging().items():
+        print(f"{mode:>7}: p50 {r['p50_s'] * 1000:7.1f} ms  p95 {r['p95_s'] * 1000:7.1f} ms  "
+              f"p99 {r['p99_s'] * 1000:7.1f} ms  hedge rate {r['hedge_rate']:.2%}")
@@ -0,0 +1,189 @@
+"""
+Opt-in per-instruction profiling.
+
+Selected instructions (by PROFILE_INSTRUCTIONS pattern or PROFILE_SAMPLE_RATE)
+run under a sampling CPU profiler and tracemalloc. Samples are written as
+collapsed stacks (one "frame;frame;... count" line per stack, ready for
+flamegraph.pl or speedscope) prefixed with the phase they were taken in, and
+the top allocation sites of each phase are written alongside. Instructions
+that are not selected pay only a pattern check.
+"""
+import os
+import re
+import sys
+import time
+import random
+import logging
+import threading
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+from config import (
+    PROFILE_INSTRUCTIONS,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_INTERVAL_S,
+    PROFILE_TOP_ALLOCATIONS,
+    PROFILE_TRACEMALLOC_FRAMES,
+)
+from event_log import log_event
+
+logger = logging.getLogger(__name__)
+
+_pattern = re.compile(PROFILE_INSTRUCTIONS, re.IGNORECASE) if PROFILE_INSTRUCTIONS else None
+
+def should_profile(instruction: str) -> bool:
+    if _pattern is not None and _pattern.search(instruction):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+def session_profile_dir(store) -> str:
+    """Profiles sit next to a screenshot store session's manifest."""
+    return os.path.splitext(store.manifest_path)[0] + "-profiles"
+
+# Keep the profiler's own bookkeeping out of the allocation report
+_SNAPSHOT_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+def _snapshot() -> Optional[tracemalloc.Snapshot]:
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """Samples every other thread's stack from a background thread."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_S):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.phases: Dict[int, str] = {}  # thread id -> current phase
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(self.phases.get(tid, "other"))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class ProfileSession:
+    def __init__(self, instruction: str, out_dir: str):
+        self.instruction = instruction
+        self.out_dir = out_dir
+        self.thread_id = threading.get_ident()  # phases are only recorded on this thread
+        self.profiler = SamplingProfiler()
+        # phase -> allocation site -> [bytes allocated, blocks]
+        self.allocations: Dict[str, Dict[str, list]] = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        self._own_tracemalloc = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+            self._own_tracemalloc = True
+        self.start_time = time.perf_counter()
+        self.profiler.start()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Tag CPU samples from this thread with name and record net allocations made during it."""
+        tid = threading.get_ident()
+        previous = self.profiler.phases.get(tid)
+        self.profiler.phases[tid] = name
+        before = _snapshot()
+        try:
+            yield
+        finally:
+            after = _snapshot()
+            if previous is None:
+                self.profiler.phases.pop(tid, None)
+            else:
+                self.profiler.phases[tid] = previous
+            if before is None or after is None:
+                return
+            with self._lock:
+                sites = self.allocations[name]
+                for stat in after.compare_to(before, "lineno"):
+                    if stat.size_diff > 0:
+                        frame = stat.traceback[0]
+                        site = sites[f"{frame.filename}:{frame.lineno}"]
+                        site[0] += stat.size_diff
+                        site[1] += max(0, stat.count_diff)
+
+    def stop(self) -> Dict[str, str]:
+        self.profiler.stop()
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+        elapsed = time.perf_counter() - self.start_time
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        slug = re.sub(r"[^a-z0-9]+", "_", self.instruction.lower()).strip("_")[:40] or "instruction"
+        base = os.path.join(self.out_dir, f"{time.strftime('%H%M%S')}_{slug}")
+        paths = {"collapsed": base + ".collapsed", "allocations": base + ".allocations.txt"}
+        self.profiler.write_collapsed(paths["collapsed"])
+        with open(paths["allocations"], "w", encoding="utf-8") as f:
+            f.write(f"# {self.instruction}\n# {elapsed:.2f}s, {self.profiler.samples} CPU samples\n")
+            f.write("# tracemalloc counts every thread: a phase's figures include allocations made\n"
+                    "# concurrently by other threads (plan prefetch, screenshot writes, planner requests)\n")
+            for phase, sites in self.allocations.items():
+                total = sum(b for b, _ in sites.values())
+                f.write(f"\n[{phase}] {total / 1024:.1f} KiB net allocated\n")
+                top = sorted(sites.items(), key=lambda kv: kv[1][0], reverse=True)[:PROFILE_TOP_ALLOCATIONS]
+                for site, (size, count) in top:
+                    f.write(f"{size / 1024:10.1f} KiB {count:8d} blocks  {site}\n")
+
+        log_event("profile", instruction=self.instruction, seconds=elapsed, samples=self.profiler.samples, **paths)
+        logger.info("Profiled '%s' (%d samples): %s", self.instruction, self.profiler.samples, paths["collapsed"])
+        return paths
+
+_active: Optional[ProfileSession] = None
+
+@contextmanager
+def profile_instruction(instruction: str, out_dir: str, force: bool = False):
+    """Profile the enclosed block if the instruction is selected; yields the session or None."""
+    global _active
+    if _active is not None or not (force or should_profile(instruction)):
+        yield None
+        return
+    _active = ProfileSession(instruction, out_dir)
+    _active.start()
+    try:
+        yield _active
+    finally:
+        session, _active = _active, None
+        session.stop()
+
+def phase(name: str):
+    """
+    Mark a phase of the instruction being profiled; a no-op when nothing is
+    profiled or when called from another thread (e.g. a plan prefetch worker).
+    """
+    session = _active
+    if session is None or session.thread_id != threading.get_ident():
+        return nullcontext()
+    return session.phase(name)
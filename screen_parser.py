@@ -1,7 +1,12 @@
+import io
+import re
 import requests
 import base64
 import logging
-import pyautogui
+import numpy as np
+from PIL import Image
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple, Union
 from config import (
     OMNISERVER_BASE_URL,
     OMNISERVER_PARSE_PATH,
@@ -11,51 +16,282 @@ from config import (
     ENABLE_CAPTION_MODEL,
     CAPTION_BOX_EXPAND_PX,
     OCR_MIN_TEXT_SIZE,
+    ENABLE_ROI_CAPTURE,
+    ROI_MIN_SIZE_PX,
+    ENABLE_LOCATION_MEMORY,
+    ENABLE_TILED_PARSE,
+    TILED_PARSE_MIN_PIXELS,
+    ENABLE_ADAPTIVE_PARSE,
+    FAST_PARSE_MATCH_THRESHOLD,
+    FAST_PARSE_OVERRIDES,
 )
 import time
+from capture_backends import Region, get_backend
+from screenshot_store import ScreenshotStore, get_screenshot_store
+from location_memory import get_location_memory
+from metrics import PHASE_SECONDS, RETRIES
+
+# Optional: for active window lookup
+try:
+    import pygetwindow as gw
+except:
+    gw = None
 
 logger = logging.getLogger(__name__)
 OMNISERVER_URL = f"{OMNISERVER_BASE_URL}{OMNISERVER_PARSE_PATH}"
 
-def capture_screen(output_path: str):
-    screenshot = pyautogui.screenshot()
-    screenshot.save(output_path)
-    logger.info(f"Screenshot saved: {output_path}")
+@PHASE_SECONDS.time(phase="capture")
+def capture_frame(region: Optional[Region] = None) -> np.ndarray:
+    """Grab an RGB frame from the active capture backend (valid until the next grab)."""
+    return get_backend().grab(region)
+
+def capture_screen(output_path: str, region: Optional[Region] = None):
+    Image.fromarray(capture_frame(region)).save(output_path)
+    logger.info("Screenshot saved: %s (region %s)", output_path, region or "full screen")
     return output_path
 
-def get_ui_elements(screenshot_path: str):
+def _clip_region(region: Region) -> Optional[Region]:
+    """Clip a region to the capturable (possibly multi-monitor) area; returns None if too little of it is visible."""
+    bounds_left, bounds_top, bounds_w, bounds_h = get_backend().bounds()
+    left, top, width, height = region
+    x1, y1 = max(bounds_left, int(left)), max(bounds_top, int(top))
+    x2 = min(bounds_left + bounds_w, int(left + width))
+    y2 = min(bounds_top + bounds_h, int(top + height))
+    if x2 - x1 < ROI_MIN_SIZE_PX or y2 - y1 < ROI_MIN_SIZE_PX:
+        return None
+    return x1, y1, x2 - x1, y2 - y1
+
+def get_active_window_region() -> Optional[Region]:
+    """Return the foreground window rectangle, or None if it cannot be determined."""
+    if not gw:
+        return None
     try:
-        with open(screenshot_path, "rb") as f:
-            img_bytes = f.read()
-        base64_image = base64.b64encode(img_bytes).decode("utf-8")
-        data = {
-            "base64_image": base64_image,
-            "use_caption_model": ENABLE_CAPTION_MODEL,
-            "som_conf_thres": SOM_CONFIDENCE_THRESHOLD,
-            "som_iou_thres": SOM_IOU_THRESHOLD,
-            "som_max_det": SOM_MAX_DETECTIONS,
-            "caption_expand_px": CAPTION_BOX_EXPAND_PX,
-            "ocr_min_text_size": OCR_MIN_TEXT_SIZE,
-        }
-        resp = requests.post(OMNISERVER_URL, json=data, timeout=45)
-        if resp.status_code != 200:
-            logger.error(f"OmniServer error {resp.status_code}: {resp.text}")
-            return []
-        payload = resp.json()
-        elements = payload.get("parsed_content_list", [])
-        logger.info(f"OmniServer extracted {len(elements)} elements")
-        normalized = []
-        for el in elements:
-            text = el.get("text") or el.get("caption") or el.get("content") or ""
-            bbox = el.get("bbox")
-            if bbox and len(bbox) == 4:
-                normalized.append({
-                    "text": text.strip(),
-                    "bbox": bbox,
-                    "type": el.get("type"),
-                    "interactivity": el.get("interactivity", False)
-                })
-        return normalized
+        win = gw.getActiveWindow()
+        if not win or getattr(win, "isMinimized", False):
+            return None
+        return _clip_region((win.left, win.top, win.width, win.height))
     except Exception as e:
-        logger.error(f"Failed to contact OmniServer: {e}")
+        logger.warning("Active window lookup failed: %s", e)
+        return None
+
+def _to_screen_coords(bbox: List[float], region: Region) -> List[float]:
+    """Map a bbox parsed from a region capture back to screen pixel coordinates."""
+    left, top, width, height = region
+    x1, y1, x2, y2 = bbox
+    if all(0 <= v <= 1 for v in (x1, y1, x2, y2)):
+        x1, x2 = x1 * width, x2 * width
+        y1, y2 = y1 * height, y2 * height
+    return [left + x1, top + y1, left + x2, top + y2]
+
+def _encode_png(frame: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(frame).save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+def parse_image_bytes(img_bytes: bytes, region: Optional[Region] = None, url: str = OMNISERVER_URL,
+                      **overrides) -> List[Dict[str, Any]]:
+    """POST an encoded image to an OmniServer endpoint and return normalized elements."""
+    data = {
+        "base64_image": base64.b64encode(img_bytes).decode("utf-8"),
+        "use_caption_model": ENABLE_CAPTION_MODEL,
+        "som_conf_thres": SOM_CONFIDENCE_THRESHOLD,
+        "som_iou_thres": SOM_IOU_THRESHOLD,
+        "som_max_det": SOM_MAX_DETECTIONS,
+        "caption_expand_px": CAPTION_BOX_EXPAND_PX,
+        "ocr_min_text_size": OCR_MIN_TEXT_SIZE,
+    }
+    data.update(overrides)
+    resp = requests.post(url, json=data, timeout=45)
+    if resp.status_code != 200:
+        logger.error("OmniServer error %s: %s", resp.status_code, resp.text)
         return []
+    payload = resp.json()
+    elements = payload.get("parsed_content_list", [])
+    logger.info("OmniServer extracted %d elements", len(elements))
+    normalized = []
+    for el in elements:
+        text = el.get("text") or el.get("caption") or el.get("content") or ""
+        bbox = el.get("bbox")
+        if bbox and len(bbox) == 4:
+            normalized.append({
+                "text": text.strip(),
+                "bbox": _to_screen_coords(bbox, region) if region else bbox,
+                "type": el.get("type"),
+                "interactivity": el.get("interactivity", False)
+            })
+    return normalized
+
+def get_ui_elements(screenshot_path: Union[str, np.ndarray], region: Optional[Region] = None, **overrides):
+    """Parse a screenshot file, or an in-memory RGB frame, with OmniServer (overrides adjust the request)."""
+    start = time.perf_counter()
+    try:
+        if isinstance(screenshot_path, np.ndarray):
+            frame = screenshot_path
+            if ENABLE_TILED_PARSE and frame.shape[0] * frame.shape[1] >= TILED_PARSE_MIN_PIXELS:
+                from tiled_parser import parse_tiled  # local import: tiled_parser builds on this module
+                return parse_tiled(frame, region, **overrides)
+            img_bytes = _encode_png(frame)
+        else:
+            with open(screenshot_path, "rb") as f:
+                img_bytes = f.read()
+        return parse_image_bytes(img_bytes, region, **overrides)
+    except Exception as e:
+        logger.error("Failed to contact OmniServer: %s", e)
+        return []
+    finally:
+        PHASE_SECONDS.observe(time.perf_counter() - start, phase="parse")
+
+# ---------------- Adaptive (two-tier) parsing ---------------- #
+
+PARSE_TIER_STATS = {tier: {"calls": 0, "seconds": 0.0, "resolved": 0} for tier in ("fast", "full")}
+
+def _names_target(target: str, text: str) -> bool:
+    return bool(re.search(rf"\b{re.escape(target.strip().lower())}\b", (text or "").lower()))
+
+def match_confidence(target: str, text: str) -> float:
+    """How confidently an element's text names the target (0..1)."""
+    target, text = target.strip().lower(), (text or "").strip().lower()
+    if not target or not text:
+        return 0.0
+    if target == text:
+        return 1.0
+    if _names_target(target, text):
+        # Whole-word containment; long surrounding text makes it less specific
+        return 0.8 + 0.2 * len(target) / len(text)
+    return SequenceMatcher(None, target, text).ratio()
+
+def best_match(elements: List[Dict[str, Any]], target: str) -> Tuple[Optional[Dict[str, Any]], float]:
+    best, best_score = None, 0.0
+    for el in elements:
+        score = match_confidence(target, el.get("text", ""))
+        if score > best_score:
+            best, best_score = el, score
+    return best, best_score
+
+def confident_match(elements: List[Dict[str, Any]], target: str) -> Optional[Dict[str, Any]]:
+    """
+    The best match if it scores FAST_PARSE_MATCH_THRESHOLD and names the target as
+    a whole word; a fuzzy look-alike ("Research" for "search") is not confident.
+    """
+    best, score = best_match(elements, target)
+    if best is None or score < FAST_PARSE_MATCH_THRESHOLD or not _names_target(target, best.get("text", "")):
+        return None
+    return best
+
+def _timed_parse(tier: str, frame: np.ndarray, region: Optional[Region], **overrides) -> List[Dict[str, Any]]:
+    start = time.perf_counter()
+    elements = get_ui_elements(frame, region=region, **overrides)
+    PARSE_TIER_STATS[tier]["calls"] += 1
+    PARSE_TIER_STATS[tier]["seconds"] += time.perf_counter() - start
+    return elements
+
+CANDIDATE_MIN_SCORE = 0.6  # below this nothing resembles the target (the executor's fuzzy cutoff)
+
+def _best_first(elements: List[Dict[str, Any]], best: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Move the scored element to the front, so the executor's first match is the element that was scored."""
+    if best is None:
+        return elements
+    return [best] + [el for el in elements if el is not best]
+
+def parse_for_target(frame: np.ndarray, region: Optional[Region], target: str,
+                     escalate_without_candidates: bool = True) -> List[Dict[str, Any]]:
+    """
+    Cheap OCR-only parse first; escalate to full icon detection and captioning
+    only when no element matches the target with high confidence. Without
+    escalate_without_candidates, a frame where nothing resembles the target is
+    returned as is, so the caller can widen the search instead.
+    """
+    elements = _timed_parse("fast", frame, region, **FAST_PARSE_OVERRIDES)
+    best, score = best_match(elements, target)
+    if score >= FAST_PARSE_MATCH_THRESHOLD:
+        PARSE_TIER_STATS["fast"]["resolved"] += 1
+        return _best_first(elements, best)
+    if not escalate_without_candidates and score < CANDIDATE_MIN_SCORE:
+        return elements
+
+    logger.info("Fast parse best match for '%s' was %.2f, escalating to full parse", target, score)
+    RETRIES.inc(kind="parse_escalation")
+    elements = _timed_parse("full", frame, region)
+    best, score = best_match(elements, target)
+    if score >= FAST_PARSE_MATCH_THRESHOLD:
+        PARSE_TIER_STATS["full"]["resolved"] += 1
+    return _best_first(elements, best)
+
+def parse_tier_report() -> Dict[str, Dict[str, float]]:
+    """Average latency per tier and the share of target lookups each tier resolved."""
+    lookups = PARSE_TIER_STATS["fast"]["calls"]
+    return {
+        tier: {
+            "calls": s["calls"],
+            "avg_ms": s["seconds"] / s["calls"] * 1000 if s["calls"] else 0.0,
+            "resolved_share": s["resolved"] / lookups if lookups else 0.0,
+        }
+        for tier, s in PARSE_TIER_STATS.items()
+    }
+
+def _parse(frame: np.ndarray, region: Optional[Region], target: Optional[str],
+           escalate_without_candidates: bool = True) -> List[Dict[str, Any]]:
+    if target and ENABLE_ADAPTIVE_PARSE:
+        return parse_for_target(frame, region, target, escalate_without_candidates)
+    return get_ui_elements(frame, region=region)
+
+def get_active_window_title() -> str:
+    """Title of the foreground window (identifies the app/site), or "" if unknown."""
+    if not gw:
+        return ""
+    try:
+        win = gw.getActiveWindow()
+        return (win.title or "") if win else ""
+    except Exception:
+        return ""
+
+def _capture_and_parse_roi(label: str, target: Optional[str], region: Optional[Region],
+                           store: ScreenshotStore) -> List[Dict[str, Any]]:
+    from action_executor import find_element_bbox  # local import: action_executor imports this module
+
+    if region:
+        region = _clip_region(region)
+    elif ENABLE_ROI_CAPTURE:
+        region = get_active_window_region()
+
+    if region:
+        frame = capture_frame(region)
+        store.put(frame, label)
+        # A region without even a weak candidate goes straight to the full screen,
+        # so a miss costs at most three parses (fast ROI, fast + full screen)
+        elements = _parse(frame, region, target, escalate_without_candidates=False)
+        if elements and (not target or find_element_bbox(elements, target)):
+            return elements
+        logger.info("'%s' not found in region %s, falling back to full screen", target, region)
+
+    frame = capture_frame()
+    store.put(frame, label)
+    return _parse(frame, get_backend().bounds(), target)
+
+def capture_and_parse(label: str, target: str = None, region: Optional[Region] = None,
+                      store: Optional[ScreenshotStore] = None) -> List[Dict[str, Any]]:
+    """
+    Capture and parse only a region of interest (an explicit region, else the
+    active window), falling back to the full screen when the target is not found there.
+    Frames are recorded under `label` in `store` (default: the process-wide store).
+    With a target, the location memory is tried first and a full parse only runs on a miss.
+    Returned bboxes are always in screen coordinates.
+    A remembered box is returned as a "memory" element carrying its "memory_key",
+    so the executor can forget it if the click leads to a failed step; only
+    confident matches are remembered.
+    """
+    memory = get_location_memory() if target and ENABLE_LOCATION_MEMORY else None
+    if memory:
+        memory_key = memory.key(get_active_window_title(), target, get_backend().bounds()[2:])
+        bbox = memory.lookup(memory_key, region)
+        if bbox:
+            return [{"text": target, "bbox": bbox, "type": "memory", "interactivity": True, "memory_key": memory_key}]
+
+    parse_start = time.perf_counter()
+    elements = _capture_and_parse_roi(label, target, region, store or get_screenshot_store())
+    if memory:
+        memory.record_parse_time(time.perf_counter() - parse_start)
+        best = confident_match(elements, target)
+        if best is not None:
+            memory.remember(memory_key, best["bbox"])
+    return elements
@@ -0,0 +1,162 @@
+"""
+Content-addressed screenshot store.
+
+Frames are keyed by a hash of their pixels, so identical frames are stored once
+and labels can never overwrite each other. Encoding and disk writes happen on a
+background thread; each session appends (label -> object) records to its own
+manifest, and old objects are evicted by age and total size.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+import numpy as np
+from PIL import Image
+from config import (
+    SCREENSHOT_DIR,
+    SCREENSHOT_FORMAT,
+    SCREENSHOT_MAX_AGE_DAYS,
+    SCREENSHOT_MAX_BYTES,
+    SCREENSHOT_RETENTION_EVERY,
+)
+from metrics import CACHE_ENTRIES, CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+class ScreenshotStore:
+    def __init__(self, root: str = SCREENSHOT_DIR, fmt: str = SCREENSHOT_FORMAT,
+                 max_age_days: float = SCREENSHOT_MAX_AGE_DAYS, max_bytes: int = SCREENSHOT_MAX_BYTES,
+                 session_id: Optional[str] = None):
+        self.root = root
+        self.fmt = fmt.lower()
+        self.max_age_s = max_age_days * 86400
+        self.max_bytes = max_bytes
+        self.session_id = session_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        self.objects_dir = os.path.join(root, "objects")
+        self.manifest_path = os.path.join(root, "sessions", f"{self.session_id}.jsonl")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+
+        # A single worker keeps writes and manifest appends ordered
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot-store")
+        self._lock = threading.Lock()
+        self._known = set()
+        self._puts = 0
+        self.stats: Dict[str, int] = {"frames": 0, "deduplicated": 0, "bytes_written": 0, "evicted": 0}
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.{self.fmt}")
+
+    @staticmethod
+    def digest(frame: np.ndarray) -> str:
+        frame = np.ascontiguousarray(frame)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(str(frame.shape).encode())
+        h.update(frame.data)
+        return h.hexdigest()
+
+    def put(self, frame: np.ndarray, label: str) -> str:
+        """
+        Store a frame under a label and return its object path. The write is
+        asynchronous; call flush() before reading the file back.
+        """
+        digest = self.digest(frame)
+        path = self._object_path(digest)
+        with self._lock:
+            self._puts += 1
+            self.stats["frames"] += 1
+            duplicate = digest in self._known or os.path.exists(path)
+            self._known.add(digest)
+            if duplicate:
+                self.stats["deduplicated"] += 1
+            CACHE_LOOKUPS.inc(cache="screenshot_store", result="hit" if duplicate else "miss")
+            CACHE_ENTRIES.set(len(self._known), cache="screenshot_store")
+            run_retention = self._puts % SCREENSHOT_RETENTION_EVERY == 0
+
+        # Capture buffers are reused between grabs, so frames are copied before queueing. Duplicates
+        # keep their pixels too: a queued retention pass may evict the object before this write runs
+        pixels = frame.copy()
+        record = {"ts": round(time.time(), 3), "label": label, "digest": digest, "path": path, "deduplicated": duplicate}
+        self._executor.submit(self._write, pixels, path, record)
+        if run_retention:
+            self._executor.submit(self.enforce_retention)
+        return path
+
+    def _write(self, pixels: np.ndarray, path: str, record: Dict):
+        try:
+            if record["deduplicated"]:
+                try:
+                    os.utime(path)  # refresh mtime so eviction treats it as recently used
+                except FileNotFoundError:
+                    # Evicted since put() saw it: store it again
+                    record = {**record, "deduplicated": False}
+                    with self._lock:
+                        self.stats["deduplicated"] -= 1
+                        self._known.add(record["digest"])
+            if not record["deduplicated"]:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                if self.fmt == "webp":
+                    Image.fromarray(pixels).save(tmp_path, format="WEBP", lossless=True, method=0)
+                else:
+                    Image.fromarray(pixels).save(tmp_path, format="PNG", compress_level=1)
+                os.replace(tmp_path, path)
+                with self._lock:
+                    self.stats["bytes_written"] += os.path.getsize(path)
+            with open(self.manifest_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except Exception as e:
+            logger.error("Failed to store screenshot %s: %s", path, e)
+
+    def enforce_retention(self):
+        """Evict objects older than the max age, then the least recently used until under the size cap."""
+        objects = []
+        now = time.time()
+        for dirpath, _, filenames in os.walk(self.objects_dir):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                objects.append((st.st_mtime, st.st_size, path))
+
+        objects.sort()
+        total = sum(size for _, size, _ in objects)
+        evicted = 0
+        for mtime, size, path in objects:
+            if now - mtime <= self.max_age_s and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+            with self._lock:
+                self._known.discard(os.path.splitext(os.path.basename(path))[0])
+        if evicted:
+            with self._lock:
+                self.stats["evicted"] += evicted
+            logger.info("Evicted %d screenshots, %d bytes retained", evicted, total)
+
+    def flush(self):
+        """Block until all queued writes have completed."""
+        self._executor.submit(lambda: None).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+_store: Optional[ScreenshotStore] = None
+
+def get_screenshot_store() -> ScreenshotStore:
+    """Return the process-wide store (one session per process)."""
+    global _store
+    if _store is None:
+        _store = ScreenshotStore()
+    return _store
@@ -0,0 +1,25 @@
+"""
+Shared setup for the smoke tests: the repo root is importable, pyautogui is
+replaced by a mock (no display is needed), and everything the agent writes to
+disk goes to a temporary directory.
+"""
+import os
+import sys
+import tempfile
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+pyautogui = mock.MagicMock()
+pyautogui.size.return_value = (1920, 1080)
+sys.modules.setdefault("pyautogui", pyautogui)
+
+import config  # noqa: E402  (patched before any agent module imports its settings)
+
+_tmp = tempfile.mkdtemp(prefix="agent-tests-")
+config.LOG_FILE = os.path.join(_tmp, "agent_events.jsonl")
+config.SCREENSHOT_DIR = os.path.join(_tmp, "screenshots")
+config.LOCATION_MEMORY_FILE = os.path.join(_tmp, "location_memory.json")
+config.APP_INDEX_FILE = os.path.join(_tmp, "app_index.json")
+config.BATCH_RESULTS_FILE = os.path.join(_tmp, "batch_results.jsonl")
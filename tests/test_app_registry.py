@@ -0,0 +1,22 @@
+import os
+import pytest
+
+psutil = pytest.importorskip("psutil")
+
+def test_process_table_keeps_os_names_and_rejects_reused_pids():
+    from app_registry import ProcessTable, _exe_key
+
+    table = ProcessTable(min_refresh_s=0)
+    own = psutil.Process(os.getpid()).name()
+    assert own in table.names()
+
+    assert table.live_process(os.getpid(), _exe_key(own)) is not None
+    # The table still thinks this PID runs something else, e.g. after PID reuse
+    assert table.live_process(os.getpid(), "notepad") is None
+
+def test_shell_is_never_focused_instead_of_opened():
+    from app_registry import is_shell_process
+
+    assert is_shell_process("explorer")
+    assert is_shell_process("Explorer.exe")
+    assert not is_shell_process("notepad")
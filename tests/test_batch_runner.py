@@ -0,0 +1,36 @@
+import io
+import json
+
+def _run(monkeypatch, prefetch, count=6):
+    import batch_runner
+
+    pulled, ahead, prefetched = [], [], []
+    def records():
+        for i in range(count):
+            pulled.append(i)
+            yield {"id": str(i), "instruction": f"step {i}"}
+    def run(instruction, planned=None):
+        # Instructions taken for planning beyond the one being executed
+        ahead.append(len(pulled) - (int(instruction.split()[-1]) + 1))
+        prefetched.append(planned is not None)
+        return {"success": True, "steps_completed": 0, "steps_total": 0, "failure": None,
+                "plan_ms": 0.0, "total_ms": 1.0}
+
+    monkeypatch.setattr(batch_runner, "plan_instruction", lambda instruction, grounded=False: ([], {}, 0.0, None))
+    monkeypatch.setattr(batch_runner, "run_instruction", run)
+    monkeypatch.setattr(batch_runner, "ENABLE_GROUNDED_PLANNING", False)
+    out = io.StringIO()
+    summary = batch_runner.run_batch(records(), out, prefetch=prefetch)
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    return summary, rows, ahead, prefetched
+
+def test_prefetch_plans_exactly_prefetch_ahead(monkeypatch):
+    summary, rows, ahead, prefetched = _run(monkeypatch, prefetch=2)
+    assert summary["instructions"] == 6 and len(rows) == 6
+    assert max(ahead) == 2
+    assert all(prefetched)
+
+def test_no_prefetch_plans_inline(monkeypatch):
+    summary, _, _, prefetched = _run(monkeypatch, prefetch=0)
+    assert summary["succeeded"] == 6
+    assert not any(prefetched)
@@ -0,0 +1,11 @@
+def test_fake_backend_grabs_without_per_frame_allocation():
+    from capture_backends import FakeBackend, benchmark_backend
+
+    backend = FakeBackend(size=(1920, 1080))
+    frame_bytes = 1920 * 1080 * 3
+    result = benchmark_backend(backend, frames=20)
+    assert result["alloc_bytes_per_frame"] < frame_bytes / 1000
+
+    # Region grabs are views into the same buffer
+    result = benchmark_backend(backend, frames=20, region=(100, 100, 640, 480))
+    assert result["alloc_bytes_per_frame"] < frame_bytes / 1000
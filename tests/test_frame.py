@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+utils = pytest.importorskip("util.utils")  # needs torch, easyocr and pywinauto
+
+def test_copy_report_measures_both_paths():
+    image = Image.fromarray(np.random.default_rng(0).integers(0, 256, (120, 160, 3), dtype=np.uint8))
+    nbytes = 120 * 160 * 3
+
+    frame = utils.Frame.from_input(image, "ocr")
+    frame.bgr()
+    assert utils.Frame.from_input(frame, "som") is frame
+    encoded, b64 = frame.encoded(), frame.base64()
+
+    report = frame.copy_report()
+    assert report["stages"] == 2
+    # One decoded array, one BGR view, one JPEG
+    assert report["bytes_copied"] == 2 * nbytes + len(encoded) + len(b64)
+    # Before Frame, each stage made its own array and BGR copy
+    assert report["legacy_bytes_copied"] == 4 * nbytes + len(encoded) + len(b64)
+
+def test_opencv_input_is_not_copied():
+    pixels = np.zeros((120, 160, 3), dtype=np.uint8)
+    frame = utils.Frame.from_input(pixels, "ocr")
+    assert frame.bgr() is pixels
+    assert frame.copy_report()["bytes_copied"] == frame.copy_report()["legacy_bytes_copied"] == 0
@@ -0,0 +1,71 @@
+import numpy as np
+
+BOX = [100, 80, 160, 120]
+
+def _screen(seed):
+    return np.random.default_rng(seed).integers(0, 256, (300, 400, 3), dtype=np.uint8)
+
+def _memory(tmp_path, monkeypatch, frame):
+    import capture_backends
+    from capture_backends import FakeBackend
+    from location_memory import LocationMemory
+
+    backend = FakeBackend([frame])
+    monkeypatch.setattr(capture_backends, "_backend", backend)
+    return LocationMemory(str(tmp_path / "memory.json")), backend
+
+def test_lookup_hit_and_region(tmp_path, monkeypatch):
+    memory, _ = _memory(tmp_path, monkeypatch, _screen(0))
+    memory.remember("k", BOX)
+
+    assert memory.lookup("k") == BOX
+    assert memory.lookup("k", region=(0, 0, 200, 150)) == BOX
+    # The remembered box lies outside an explicit region: parse instead
+    assert memory.lookup("k", region=(200, 0, 200, 300)) is None
+
+def test_lookup_miss_when_screen_changed(tmp_path, monkeypatch):
+    memory, backend = _memory(tmp_path, monkeypatch, _screen(0))
+    memory.remember("k", BOX)
+    backend.frames = [_screen(1)]
+
+    assert memory.lookup("k") is None
+    assert memory.stats["misses"] == 1
+
+def test_only_confident_matches_are_remembered(tmp_path, monkeypatch):
+    import screen_parser
+
+    memory, _ = _memory(tmp_path, monkeypatch, _screen(0))
+    monkeypatch.setattr(screen_parser, "get_location_memory", lambda: memory)
+    monkeypatch.setattr(screen_parser, "get_active_window_title", lambda: "")
+
+    parsed = [{"text": "Research", "bbox": BOX, "type": "text", "interactivity": True}]
+    monkeypatch.setattr(screen_parser, "_capture_and_parse_roi", lambda *a: parsed)
+    screen_parser.capture_and_parse("t", target="search")
+    assert memory.entries == {}
+
+    parsed = [{"text": "Search", "bbox": BOX, "type": "text", "interactivity": True}]
+    screen_parser.capture_and_parse("t", target="search")
+    assert len(memory.entries) == 1
+    assert screen_parser.capture_and_parse("t", target="search")[0]["type"] == "memory"
+
+def test_failed_step_after_remembered_click_forgets_it(monkeypatch):
+    import agent
+
+    def fake_parse(label, target=None, region=None):
+        if target == "search":
+            return [{"text": "search", "bbox": BOX, "type": "memory", "interactivity": True, "memory_key": "k"}]
+        return []
+
+    forgotten = []
+    class FakeMemory:
+        def forget(self, key):
+            forgotten.append(key)
+
+    monkeypatch.setattr(agent, "capture_and_parse", fake_parse)
+    monkeypatch.setattr(agent, "get_location_memory", lambda: FakeMemory())
+    steps = [{"action": "click", "target": "search", "needs_parse": True},
+             {"action": "click", "target": "missing", "needs_parse": True}]
+
+    result = agent.execute_plan("forget", steps)
+    assert not result["success"]
+    assert forgotten == ["k"]
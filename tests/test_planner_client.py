@@ -0,0 +1,51 @@
+import pytest
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+@pytest.fixture
+def mock_providers():
+    from planner_client import start_mock_provider
+
+    servers = []
+    def start(**kwargs):
+        server, url = start_mock_provider(**kwargs)
+        servers.append(server)
+        return url
+    yield start
+    for server in servers:
+        server.shutdown()
+
+def test_slow_primary_is_hedged(monkeypatch, mock_providers):
+    import planner_client
+    from planner_client import PlannerClient, Provider
+
+    monkeypatch.setattr(planner_client, "PLANNER_HEDGE_DEFAULT_S", 0.05)
+    client = PlannerClient([Provider("slow", mock_providers(delay_s=1.0)), Provider("fast", mock_providers())])
+
+    body, provider = client.complete(MESSAGES)
+    assert provider == "fast"
+    assert body["choices"][0]["message"]["content"]
+    report = client.report()
+    assert (report["hedged"], report["hedge_wins"], report["failovers"]) == (1, 1, 0)
+
+def test_failed_primary_fails_over(mock_providers):
+    from planner_client import PlannerClient, Provider
+
+    broken = Provider("broken", mock_providers(fail_rate=1.0))
+    client = PlannerClient([broken, Provider("ok", mock_providers())], hedge=False)
+
+    assert client.complete(MESSAGES)[1] == "ok"
+    assert client.report()["failovers"] == 1
+    assert broken.error_rate > 0
+    # Demoted after the error
+    assert [p.name for p in client.ranked()] == ["ok", "broken"]
+
+def test_error_rate_decays_without_traffic(monkeypatch):
+    import planner_client
+    from planner_client import Provider
+
+    provider = Provider("idle", "http://127.0.0.1:9")
+    provider.record(False, 0.1)
+    assert provider.error_rate == pytest.approx(0.2, rel=1e-3)
+    provider._error_time -= 2 * planner_client.PLANNER_ERROR_HALF_LIFE_S
+    assert provider.error_rate == pytest.approx(0.05, rel=1e-3)
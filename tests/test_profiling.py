@@ -0,0 +1,32 @@
+import threading
+import tracemalloc
+
+def test_phases_from_other_threads_are_not_recorded(tmp_path):
+    import profiling
+
+    seen = []
+    with profiling.profile_instruction("open notepad", str(tmp_path), force=True) as session:
+        with profiling.phase("parse"):
+            data = [bytearray(1024) for _ in range(100)]
+
+        def prefetch():
+            with profiling.phase("plan"):
+                seen.append(threading.get_ident())
+        worker = threading.Thread(target=prefetch)
+        worker.start()
+        worker.join()
+
+    assert seen
+    assert "parse" in session.allocations
+    assert "plan" not in session.allocations
+    assert not tracemalloc.is_tracing()
+    assert len(list(tmp_path.iterdir())) == 2
+    del data
+
+def test_phase_survives_tracemalloc_stopping(tmp_path):
+    import profiling
+
+    with profiling.profile_instruction("open notepad", str(tmp_path), force=True) as session:
+        with session.phase("parse"):
+            tracemalloc.stop()
+    assert "parse" not in session.allocations
@@ -0,0 +1,32 @@
+def _el(text, x=0):
+    return {"text": text, "bbox": [x, 0, x + 50, 20], "type": "text", "interactivity": True}
+
+class _Store:
+    def put(self, frame, label):
+        return label
+
+def test_clicked_element_is_the_scored_element(monkeypatch):
+    import screen_parser
+    from action_executor import find_element_bbox
+
+    # "Sign in to continue" passes the executor's substring check first,
+    # but the exact "Sign in" button is the best match
+    elements = [_el("Sign in to continue", 0), _el("Sign in", 100)]
+    monkeypatch.setattr(screen_parser, "get_ui_elements", lambda frame, region=None, **kw: list(elements))
+    parsed = screen_parser.parse_for_target(None, None, "sign in")
+    assert find_element_bbox(parsed, "sign in") == [100, 0, 150, 20]
+
+def test_roi_miss_costs_at_most_three_parses(monkeypatch):
+    import screen_parser
+    from capture_backends import FakeBackend
+
+    calls = []
+    def fake_parse(frame, region=None, **overrides):
+        calls.append((region, "fast" if overrides else "full"))
+        return [_el("Unrelated")]
+    monkeypatch.setattr(screen_parser, "get_ui_elements", fake_parse)
+    monkeypatch.setattr(screen_parser, "get_backend", lambda: FakeBackend(size=(200, 100)))
+    monkeypatch.setattr(screen_parser, "capture_frame", lambda region=None: FakeBackend(size=(200, 100)).grab(region))
+
+    screen_parser._capture_and_parse_roi("t", "checkout", (0, 0, 100, 50), _Store())
+    assert [tier for _, tier in calls] == ["fast", "fast", "full"]
@@ -0,0 +1,24 @@
+import json
+import os
+import numpy as np
+
+def test_duplicate_of_evicted_object_is_stored_again(tmp_path):
+    from screenshot_store import ScreenshotStore
+
+    store = ScreenshotStore(root=str(tmp_path), fmt="png")
+    frame = np.full((40, 60, 3), 7, dtype=np.uint8)
+    path = store.put(frame, "first")
+    store.flush()
+    assert os.path.exists(path)
+
+    # Retention evicts the object after put() has already classified the next frame as a duplicate
+    os.remove(path)
+    assert store.put(frame, "second") == path
+    store.flush()
+    store.close()
+
+    assert os.path.exists(path)
+    with open(store.manifest_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [r["label"] for r in records] == ["first", "second"]
+    assert store.stats["deduplicated"] == 0
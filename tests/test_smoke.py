@@ -0,0 +1,142 @@
+import sys
+
+def test_execute_plan_keyboard_run():
+    from agent import execute_plan
+    from plan_optimizer import optimize_plan
+
+    pyautogui = sys.modules["pyautogui"]
+    pyautogui.reset_mock()
+    steps, _ = optimize_plan([
+        {"action": "hotkey", "keys": "ctrl+l"},
+        {"action": "type", "text": "hello"},
+        {"action": "press", "target": "enter"},
+    ])
+    result = execute_plan("smoke", steps)
+
+    assert result["success"], result
+    assert result["steps_completed"] == 3
+    assert result["injected_events"] > 0
+    pyautogui.hotkey.assert_called()
+    pyautogui.press.assert_called_with("enter", _pause=False)
+
+def test_folded_wait_between_keyboard_steps_is_applied(monkeypatch):
+    import input_batcher
+    from agent import execute_plan
+    from plan_optimizer import optimize_plan
+
+    steps, _ = optimize_plan([
+        {"action": "hotkey", "keys": "ctrl+l"},
+        {"action": "type", "text": "weather"},
+        {"action": "wait", "target": "2 seconds"},
+        {"action": "press", "target": "enter"},
+    ])
+    assert steps[-1]["settle"] == 2.0
+    assert [len(g) for g in input_batcher.coalesce_plan(steps)] == [2, 1]
+
+    slept = []
+    monkeypatch.setattr(input_batcher.time, "sleep", slept.append)
+    assert execute_plan("smoke", steps)["success"]
+    assert 2.0 in slept
+
+def test_descriptive_wait_defaults_to_at_least_two_seconds():
+    from plan_optimizer import optimize_plan
+
+    steps, _ = optimize_plan([{"action": "wait", "target": "for results"}, {"action": "press", "target": "enter"}])
+    assert steps[0]["settle"] >= 2.0
+
+def test_grounded_plan_keeps_only_digest_ids(monkeypatch):
+    import json
+    import instruction_parser
+
+    elements = [
+        {"bbox": [0, 0, 100, 20], "text": "Search", "type": "text", "interactivity": True},
+        {"bbox": [0, 30, 100, 50], "text": "Footer", "type": "text", "interactivity": False},
+    ]
+    plan = [{"action": "click", "target": "Search", "element_id": 0},
+            {"action": "click", "target": "Footer", "element_id": 1},
+            {"action": "click", "target": "Ghost", "element_id": 7}]
+
+    class FakeClient:
+        def complete(self, messages, **params):
+            return {"choices": [{"message": {"content": json.dumps(plan)}}]}, "fake"
+
+    monkeypatch.setattr(instruction_parser, "ENABLE_GROUNDED_PLANNING", True)
+    monkeypatch.setattr(instruction_parser, "get_planner_client", lambda: FakeClient())
+
+    steps, ids = instruction_parser.plan_with_screen("click search", elements)
+    assert ids == {0}
+    assert [s.get("element_id") for s in steps] == [0, None, None]
+    assert [s["target"] for s in steps] == ["Search", "Footer", "Ghost"]
+
+    # No interactive elements: nothing was shown, so the plan is blind
+    _, ids = instruction_parser.plan_with_screen("click footer", elements[1:])
+    assert ids == set()
+
+def test_digest_positions_are_relative_to_the_parsed_extent():
+    from instruction_parser import build_screen_digest
+
+    # A window on the right half of a 3840 px wide screen
+    elements = [
+        {"bbox": [1930, 10, 1970, 30], "text": "File", "type": "text", "interactivity": True},
+        {"bbox": [3780, 2100, 3830, 2150], "text": "OK", "type": "text", "interactivity": True},
+    ]
+    digest, _ = build_screen_digest(elements)
+    assert digest.splitlines() == ["0|text|File|top-left", "1|text|OK|bottom-right"]
+
+def test_grounded_plan_parses_the_whole_screen(monkeypatch):
+    import agent
+    from capture_backends import FakeBackend
+
+    regions = []
+    monkeypatch.setattr(agent, "get_backend", lambda: FakeBackend(size=(3840, 2160)))
+    monkeypatch.setattr(agent, "capture_and_parse", lambda label, region=None: regions.append(region) or [])
+    monkeypatch.setattr(agent, "plan_with_screen", lambda instruction, elements: ([], set()))
+
+    agent.plan_instruction("click ok", grounded=True)
+    assert regions == [(0, 0, 3840, 2160)]
+
+def test_subquery_settles_after_navigate(monkeypatch):
+    import llm_subquery
+    from config import LOAD_SETTLE_S
+
+    plan = [{"action": "navigate", "target": "youtube.com"}, {"action": "type", "text": "despacito"}]
+    executed, slept = [], []
+    monkeypatch.setattr(llm_subquery, "capture_and_parse", lambda label, store=None: [])
+    monkeypatch.setattr(llm_subquery, "plan_with_screen", lambda subquery, elements: (plan, set()))
+    monkeypatch.setattr(llm_subquery, "execute_action", lambda action, elements: executed.append(action["action"]) or True)
+    monkeypatch.setattr(llm_subquery.time, "sleep", slept.append)
+
+    llm_subquery.execute_subquery("search despacito on youtube", None, 1)
+    assert executed == ["navigate", "type"]
+    assert slept == [LOAD_SETTLE_S]
+
+def test_trailing_wait_is_kept(monkeypatch):
+    import input_batcher
+    from agent import execute_plan
+    from plan_optimizer import optimize_plan
+
+    steps, _ = optimize_plan([{"action": "press", "target": "enter"}, {"action": "wait", "target": "5 seconds"}])
+    assert steps[-1] == {"action": "wait", "settle": 5.0, "needs_parse": False}
+
+    slept = []
+    monkeypatch.setattr(input_batcher.time, "sleep", slept.append)
+    result = execute_plan("smoke", steps)
+    assert result["success"] and result["steps_completed"] == 2
+    assert slept.count(5.0) == 1 and 2 not in slept
+
+def test_launch_steps_are_not_recorded_as_injection(monkeypatch):
+    import agent
+    import input_batcher
+
+    phases = []
+    class Recorder:
+        def observe(self, value, phase):
+            phases.append(phase)
+    monkeypatch.setattr(agent, "PHASE_SECONDS", Recorder())
+    monkeypatch.setattr(agent, "execute_action", lambda action, elements: True)
+    monkeypatch.setattr(agent, "capture_and_parse", lambda *a, **kw: [])
+    monkeypatch.setattr(input_batcher.time, "sleep", lambda seconds: None)
+
+    agent.execute_plan("smoke", [{"action": "navigate", "target": "example.com"},
+                                 {"action": "scroll", "target": "down"}])
+    assert phases == ["launch", "inject"]
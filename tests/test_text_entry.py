@@ -0,0 +1,14 @@
+import sys
+
+def test_long_text_without_clipboard_is_burst_typed(monkeypatch):
+    import text_entry
+
+    monkeypatch.setattr(text_entry, "pyperclip", None)
+    pyautogui = sys.modules["pyautogui"]
+    pyautogui.reset_mock()
+
+    text = "a fairly long sentence that would normally be pasted " * 3
+    assert text_entry.enter_text(text, field="body", verify=False)
+    intervals = {c.kwargs["interval"] for c in pyautogui.write.call_args_list}
+    assert intervals == {0.0}
+    assert "".join(c.args[0] for c in pyautogui.write.call_args_list) == text
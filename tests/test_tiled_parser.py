@@ -0,0 +1,26 @@
+LEFT, RIGHT = (0, 0, 1280, 1080), (1152, 0, 1280, 1080)  # 128 px shared band at x 1152..1280
+
+def _el(text, bbox):
+    return {"text": text, "bbox": bbox, "type": "text", "interactivity": True}
+
+def test_nested_elements_within_a_tile_are_kept():
+    from tiled_parser import merge_elements
+
+    button, icon = _el("Search", [100, 100, 300, 140]), _el("", [105, 105, 135, 135])
+    label = _el("Search", [140, 105, 220, 135])
+    assert merge_elements([(LEFT, [button, icon, label])]) == [button, label, icon]  # largest first
+
+def test_cross_tile_duplicate_in_the_band_is_merged():
+    from tiled_parser import merge_elements
+
+    whole, clipped = _el("Submit", [1180, 500, 1260, 530]), _el("Submit", [1180, 500, 1250, 530])
+    icon_left, icon_right = _el("", [1200, 600, 1230, 630]), _el("", [1200, 600, 1230, 630])
+    merged = merge_elements([(LEFT, [whole, icon_left]), (RIGHT, [clipped, icon_right])])
+    assert merged == [whole, icon_left]
+
+def test_different_text_or_untexted_match_is_not_a_duplicate():
+    from tiled_parser import merge_elements
+
+    box = _el("Search", [1160, 100, 1270, 140])
+    icon = _el("", [1165, 105, 1195, 135])
+    assert len(merge_elements([(LEFT, [box]), (RIGHT, [icon])])) == 2
@@ -0,0 +1,172 @@
+"""
+Fast text entry for the type action.
+
+Long or non-ASCII strings are pasted through the clipboard; short ASCII strings,
+and everything when no clipboard is available, are typed in bursts with no
+per-character delay. Fields that reject paste are remembered and get per-key
+typing; they are only detected when read-back verification (TEXT_VERIFY) is on.
+"""
+import sys
+import time
+import logging
+from typing import Dict, List, Optional
+import pyautogui
+from config import (
+    TEXT_PASTE_MIN_CHARS,
+    TEXT_BURST_CHARS,
+    TEXT_BURST_GAP_S,
+    TEXT_KEY_INTERVAL_S,
+    TEXT_PASTE_SETTLE_S,
+    TEXT_VERIFY,
+)
+from metrics import RETRIES
+
+# Optional: clipboard access for the paste path and read-back verification
+try:
+    import pyperclip
+except:
+    pyperclip = None
+
+logger = logging.getLogger(__name__)
+
+MODIFIER = "command" if sys.platform == "darwin" else "ctrl"
+
+_paste_blocked = set()  # fields where a paste did not land
+_burst_interval: Dict[str, float] = {}  # per-field typing interval, raised when bursts drop characters
+
+STATS: Dict[str, Dict[str, float]] = {
+    mode: {"chars": 0, "seconds": 0.0} for mode in ("paste", "burst", "per_key")
+}
+
+def _record(mode: str, chars: int, seconds: float):
+    STATS[mode]["chars"] += chars
+    STATS[mode]["seconds"] += seconds
+
+def chars_per_second() -> Dict[str, float]:
+    return {mode: s["chars"] / s["seconds"] for mode, s in STATS.items() if s["seconds"]}
+
+def _clipboard_get() -> Optional[str]:
+    try:
+        return pyperclip.paste()
+    except Exception:
+        return None
+
+def paste_text(text: str) -> bool:
+    """Paste text via the clipboard, restoring the previous clipboard contents."""
+    if pyperclip is None:
+        return False
+    saved = _clipboard_get()
+    try:
+        pyperclip.copy(text)
+        pyautogui.hotkey(MODIFIER, "v", _pause=False)
+        time.sleep(TEXT_PASTE_SETTLE_S)  # let the target read the clipboard before it is restored
+        return True
+    except Exception as e:
+        logger.warning("Paste failed: %s", e)
+        return False
+    finally:
+        if saved is not None:
+            pyperclip.copy(saved)
+
+def burst_type(text: str, interval: float = 0.0):
+    """Type text in bursts of TEXT_BURST_CHARS, pausing briefly between bursts."""
+    for i in range(0, len(text), TEXT_BURST_CHARS):
+        if i:
+            time.sleep(TEXT_BURST_GAP_S)
+        pyautogui.write(text[i:i + TEXT_BURST_CHARS], interval=interval, _pause=False)
+
+def read_back() -> Optional[str]:
+    """Return the focused field's text (select all + copy), or None if unavailable."""
+    if pyperclip is None:
+        return None
+    saved = _clipboard_get()
+    try:
+        pyperclip.copy("")
+        pyautogui.hotkey(MODIFIER, "a", _pause=False)
+        pyautogui.hotkey(MODIFIER, "c", _pause=False)
+        time.sleep(TEXT_PASTE_SETTLE_S)
+        pyautogui.press("end", _pause=False)  # drop the selection so later typing appends
+        return _clipboard_get()
+    finally:
+        if saved is not None:
+            pyperclip.copy(saved)
+
+def _retype(text: str, interval: float):
+    """Replace the field contents with text, typed key by key."""
+    pyautogui.hotkey(MODIFIER, "a", _pause=False)
+    pyautogui.write(text, interval=interval, _pause=False)
+
+def enter_text(text: str, field: str = None, verify: bool = TEXT_VERIFY) -> bool:
+    """
+    Enter text into the focused field using the fastest path that works.
+    `field` identifies the target (e.g. the action's target) for remembering
+    paste-blocking fields and per-field typing speed. Verification assumes the
+    field only holds the entered text.
+    """
+    if not text:
+        return True
+    field = (field or "").lower()
+    start = time.perf_counter()
+
+    pasteable = len(text) >= TEXT_PASTE_MIN_CHARS or not text.isascii()
+    if pasteable and field not in _paste_blocked and paste_text(text):
+        typed = read_back() if verify else None
+        if typed is None or text in typed:
+            _record("paste", len(text), time.perf_counter() - start)
+            return True
+        logger.info("Paste rejected by field '%s', falling back to per-key typing", field)
+        _paste_blocked.add(field)
+        start = time.perf_counter()
+    if pasteable and field in _paste_blocked:
+        pyautogui.write(text, interval=TEXT_KEY_INTERVAL_S, _pause=False)
+        _record("per_key", len(text), time.perf_counter() - start)
+        return True
+
+    interval = _burst_interval.get(field, 0.0)
+    burst_type(text, interval)
+    if verify:
+        typed = read_back()
+        if typed is not None and text not in typed:
+            # Keystrokes were dropped: slow this field down and retype
+            _burst_interval[field] = max(TEXT_KEY_INTERVAL_S, interval * 2)
+            logger.info("Burst typing dropped characters in '%s', retyping at %.3fs/key",
+                        field, _burst_interval[field])
+            RETRIES.inc(kind="retype")
+            _retype(text, _burst_interval[field])
+            _record("per_key", len(text), time.perf_counter() - start)
+            return True
+    _record("burst", len(text), time.perf_counter() - start)
+    return True
+
+# ---------------- Benchmark ---------------- #
+
+def benchmark_text_entry(samples: List[str] = None) -> Dict[str, float]:
+    """
+    Characters per second for each entry path. Types into whatever has focus,
+    so run it with a scratch text field (e.g. an empty Notepad window) focused.
+    """
+    samples = samples or ["hello world", "despacito official video", "x" * 200]
+    results = {}
+    for mode in ("paste", "burst", "per_key"):
+        chars, elapsed = 0, 0.0
+        for text in samples:
+            start = time.perf_counter()
+            if mode == "paste":
+                if not paste_text(text):
+                    break
+            elif mode == "burst":
+                burst_type(text)
+            else:
+                pyautogui.write(text, interval=TEXT_KEY_INTERVAL_S, _pause=False)
+            elapsed += time.perf_counter() - start
+            chars += len(text)
+            pyautogui.press("enter", _pause=False)
+        if elapsed:
+            results[mode] = chars / elapsed
+    return results
+
+if __name__ == "__main__":
+    print("Focus a scratch text field; starting in 3 seconds...")
+    time.sleep(3)
+    for mode, cps in benchmark_text_entry().items():
+        print(f"{mode:>8}: {cps:8.1f} chars/s")
@@ -0,0 +1,169 @@
+"""
+Tiled parallel parsing for high-resolution and multi-monitor frames.
+
+The frame is split into overlapping tiles that are parsed concurrently across
+the OmniServer endpoint pool, then merged back into frame (or screen)
+coordinates with cross-tile duplicate suppression. Smaller tiles also keep small
+text above the detector's input resolution.
+"""
+import math
+import time
+import logging
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from config import (
+    TILE_SIZE_PX,
+    TILE_OVERLAP_PX,
+    TILE_MERGE_IOU,
+    OMNISERVER_ENDPOINTS,
+    TILE_WORKERS_PER_ENDPOINT,
+)
+from capture_backends import Region
+from screen_parser import _encode_png, parse_image_bytes
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=max(1, len(OMNISERVER_ENDPOINTS) * TILE_WORKERS_PER_ENDPOINT),
+                               thread_name_prefix="tile-parse")
+
+def _starts(length: int, tile: int, overlap: int) -> List[int]:
+    """Evenly spaced tile offsets with at least `overlap` pixels shared by neighbors."""
+    if length <= tile:
+        return [0]
+    count = math.ceil((length - overlap) / (tile - overlap))
+    return [round(i * (length - tile) / (count - 1)) for i in range(count)]
+
+def tile_regions(width: int, height: int, tile: int = TILE_SIZE_PX, overlap: int = TILE_OVERLAP_PX) -> List[Region]:
+    """Overlapping (left, top, width, height) tiles covering a width x height frame."""
+    return [
+        (x, y, min(tile, width - x), min(tile, height - y))
+        for y in _starts(height, tile, overlap)
+        for x in _starts(width, tile, overlap)
+    ]
+
+def _area(b: List[float]) -> float:
+    return max(0.0, b[2] - b[0]) * max(0.0, b[3] - b[1])
+
+def _overlap(a: List[float], b: List[float]) -> Tuple[float, float]:
+    """(IoU, intersection over the smaller box)."""
+    iw = min(a[2], b[2]) - max(a[0], b[0])
+    ih = min(a[3], b[3]) - max(a[1], b[1])
+    if iw <= 0 or ih <= 0:
+        return 0.0, 0.0
+    inter = iw * ih
+    area_a, area_b = _area(a), _area(b)
+    return inter / (area_a + area_b - inter), inter / max(1e-9, min(area_a, area_b))
+
+def _same_text(a: str, b: str) -> bool:
+    a, b = a.lower(), b.lower()
+    if not a or not b:
+        return a == b
+    return a in b or b in a
+
+def _shared_band(a: Region, b: Region) -> Optional[List[float]]:
+    """The area two tiles both cover, as a bbox, or None if they do not overlap."""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    return [x1, y1, x2, y2] if x2 > x1 and y2 > y1 else None
+
+def merge_elements(tiles: List[Tuple[Region, List[Dict[str, Any]]]], iou: float = TILE_MERGE_IOU) -> List[Dict[str, Any]]:
+    """
+    Suppress duplicates seen by several overlapping tiles, given (tile region,
+    elements) pairs in the same coordinates. Only elements from different tiles
+    that both reach into those tiles' shared band are compared, so nested
+    elements within one tile (an icon inside a button) are kept. Larger boxes
+    win, since a copy clipped by a tile edge is the smaller one.
+    """
+    tagged = [(el, i) for i, (_, elements) in enumerate(tiles) for el in elements]
+    kept: List[Tuple[Dict[str, Any], int]] = []
+    for el, tile in sorted(tagged, key=lambda t: _area(t[0]["bbox"]), reverse=True):
+        duplicate = False
+        for other, other_tile in kept:
+            if other_tile == tile:
+                continue
+            band = _shared_band(tiles[tile][0], tiles[other_tile][0])
+            if band is None or not _overlap(el["bbox"], band)[1] or not _overlap(other["bbox"], band)[1]:
+                continue
+            box_iou, containment = _overlap(el["bbox"], other["bbox"])
+            if (box_iou >= iou or containment >= 0.8) and _same_text(el["text"], other["text"]):
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append((el, tile))
+    return [el for el, _ in kept]
+
+def _parse_tile(frame: np.ndarray, tile: Region, origin: Tuple[int, int], url: str,
+                overrides: Dict[str, Any]) -> List[Dict[str, Any]]:
+    x, y, w, h = tile
+    try:
+        img_bytes = _encode_png(frame[y:y + h, x:x + w])
+        return parse_image_bytes(img_bytes, region=(origin[0] + x, origin[1] + y, w, h), url=url, **overrides)
+    except Exception as e:
+        logger.error("Tile %s parse failed on %s: %s", tile, url, e)
+        return []
+
+def parse_tiled(frame: np.ndarray, region: Optional[Region] = None, **overrides) -> List[Dict[str, Any]]:
+    """
+    Parse a frame tile by tile across the endpoint pool. Boxes are returned in
+    screen coordinates when `region` (the frame's screen rectangle) is given,
+    else in frame pixels.
+    """
+    height, width = frame.shape[:2]
+    origin = (region[0], region[1]) if region else (0, 0)
+    tiles = tile_regions(width, height)
+    endpoints = itertools.cycle(OMNISERVER_ENDPOINTS)
+    start = time.perf_counter()
+    futures = [_executor.submit(_parse_tile, frame, tile, origin, next(endpoints), overrides) for tile in tiles]
+    # Tile regions in the elements' coordinates, for duplicate suppression
+    parsed = [((origin[0] + x, origin[1] + y, w, h), f.result()) for (x, y, w, h), f in zip(tiles, futures)]
+    merged = merge_elements(parsed)
+    logger.info("Tiled parse: %d tiles, %d elements (%d after merge) in %.2fs",
+                len(tiles), sum(len(els) for _, els in parsed), len(merged), time.perf_counter() - start)
+    return merged
+
+# ---------------- Benchmark ---------------- #
+
+def _recall(reference: List[Dict[str, Any]], found: List[Dict[str, Any]], iou: float = TILE_MERGE_IOU) -> float:
+    if not reference:
+        return 1.0
+    hits = sum(1 for r in reference if any(_overlap(r["bbox"], f["bbox"])[0] >= iou for f in found))
+    return hits / len(reference)
+
+def benchmark_tiled_parse(image: Image.Image, resolutions: Dict[str, Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Latency and recall of whole-frame vs tiled parsing with the image scaled to
+    each resolution. Recall is measured against the merged union of both result
+    sets, since no ground truth is available.
+    """
+    resolutions = resolutions or {"1080p": (1920, 1080), "1440p": (2560, 1440), "4K": (3840, 2160)}
+    results = []
+    for name, size in resolutions.items():
+        frame = np.asarray(image.convert("RGB").resize(size))
+
+        start = time.perf_counter()
+        whole = parse_image_bytes(_encode_png(frame), region=(0, 0, size[0], size[1]))
+        whole_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tiled = parse_tiled(frame)
+        tiled_s = time.perf_counter() - start
+
+        full = (0, 0, size[0], size[1])
+        reference = merge_elements([(full, whole), (full, tiled)])
+        results.append({
+            "resolution": name,
+            "whole_s": whole_s,
+            "tiled_s": tiled_s,
+            "whole_recall": _recall(reference, whole),
+            "tiled_recall": _recall(reference, tiled),
+        })
+    return results
+
+if __name__ == "__main__":
+    import sys
+    for r in benchmark_tiled_parse(Image.open(sys.argv[1])):
+        print(f"{r['resolution']:>6}: whole {r['whole_s']:6.2f}s recall {r['whole_recall']:.2f} | "
+              f"tiled {r['tiled_s']:6.2f}s recall {r['tiled_recall']:.2f}")
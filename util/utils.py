@@ -17,6 +17,97 @@ import psutil
 import threading
 from typing import Dict, List, Optional, Tuple, Any
 
+# Optional: fast text entry from the agent package (clipboard paste / burst typing)
+try:
+    from text_entry import enter_text
+except ImportError:
+    enter_text = None
+
+# Optional: cached process table from the agent package
+try:
+    from app_registry import get_process_table
+except ImportError:
+    get_process_table = None
+
+class Frame:
+    """
+    One decoded image buffer shared by every pipeline stage.
+
+    Colour-space conversions and encodings are produced on first use and cached,
+    so stages handed the same Frame stop re-converting the same pixels.
+    `bytes_copied` counts every buffer derived from the original.
+    """
+
+    def __init__(self, pixels: np.ndarray, order: str = "RGB", source=None):
+        self.pixels = pixels
+        self.order = order
+        self.source = pixels if source is None else source  # the input as the caller passed it
+        self.stages: List[str] = []
+        self.bytes_copied = 0
+        self._cache: Dict[Any, Any] = {}
+
+    @classmethod
+    def from_input(cls, image_input, stage: str = "convert") -> "Frame":
+        """Wrap a PIL image (RGB), an OpenCV array (BGR) or an existing Frame; each call is one named stage."""
+        if isinstance(image_input, Frame):
+            frame = image_input
+        elif isinstance(image_input, Image.Image):
+            frame = cls(np.asarray(image_input.convert("RGB")), "RGB", source=image_input)
+            frame.bytes_copied += frame.pixels.nbytes
+        else:
+            frame = cls(image_input, "BGR")
+        frame.stages.append(stage)
+        return frame
+
+    def _derived(self, key, make):
+        if key not in self._cache:
+            value = self._cache[key] = make()
+            self.bytes_copied += getattr(value, "nbytes", None) or len(value)
+        return self._cache[key]
+
+    def rgb(self) -> np.ndarray:
+        if self.order == "RGB":
+            return self.pixels
+        return self._derived("rgb", lambda: cv2.cvtColor(self.pixels, cv2.COLOR_BGR2RGB))
+
+    def bgr(self) -> np.ndarray:
+        if self.order == "BGR":
+            return self.pixels
+        return self._derived("bgr", lambda: cv2.cvtColor(self.pixels, cv2.COLOR_RGB2BGR))
+
+    def encoded(self, ext: str = ".jpg") -> bytes:
+        return self._derived(("encoded", ext), lambda: cv2.imencode(ext, self.bgr())[1].tobytes())
+
+    def base64(self, ext: str = ".jpg") -> str:
+        return self._derived(("base64", ext), lambda: base64.b64encode(self.encoded(ext)).decode('utf-8'))
+
+    def copy_report(self) -> Dict[str, int]:
+        """Bytes copied for this frame versus the per-stage path, measured by running it on the same input."""
+        return {
+            "frame_bytes": self.pixels.nbytes,
+            "stages": len(self.stages),
+            "bytes_copied": self.bytes_copied,
+            "legacy_bytes_copied": legacy_bytes_copied(self.source, self.stages),
+        }
+
+def legacy_bytes_copied(image_input, stages: List[str]) -> int:
+    """
+    Run the conversions the helpers made before Frame for each stage and count the
+    bytes they produced: np.array + cvtColor(RGB2BGR) for a PIL image, plus a JPEG
+    encode and base64 for SOM labeling.
+    """
+    copied = 0
+    for stage in stages:
+        image_cv = image_input
+        if isinstance(image_input, Image.Image):
+            image_np = np.array(image_input)
+            image_cv = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+            copied += image_np.nbytes + image_cv.nbytes
+        if stage == "som":
+            _, buffer = cv2.imencode('.jpg', image_cv)
+            copied += buffer.nbytes + len(base64.b64encode(buffer))
+    return copied
+
 def get_caption_model_processor(model_name="florence2", model_name_or_path="weights/icon_caption_florence"):
     """Get Florence model and processor, handling custom configuration."""
     try:
@@ -53,11 +144,7 @@ def get_caption_model_processor(model_name="florence2", model_name_or_path="weig
 def check_ocr_box(image_input, display_img=False, output_bb_format='xyxy', goal_filtering=None, easyocr_args=None, use_paddleocr=True):
     """Basic OCR text extraction with bounding boxes."""
     try:
-        # Convert PIL image to OpenCV format
-        if isinstance(image_input, Image.Image):
-            image_cv = cv2.cvtColor(np.array(image_input), cv2.COLOR_RGB2BGR)
-        else:
-            image_cv = image_input
+        image_cv = Frame.from_input(image_input, "ocr").bgr()
         
         # Use EasyOCR for text detection
         reader = easyocr.Reader(['en'])
@@ -105,14 +192,16 @@ def get_yolo_model(model_path=None):
     except Exception as e:
         raise NotImplementedError(f"YOLO model support not available: {e}")
 
-def get_som_labeled_img(image_input, yolo_model, BOX_TRESHOLD=0.05, output_coord_in_ratio=True, ocr_bbox=None, draw_bbox_config=None, caption_model_processor=None, ocr_text=None, iou_threshold=0.1, imgsz=640):
-    """Basic SOM labeling implementation using YOLO and OCR results."""
+def get_som_labeled_img(image_input, yolo_model, BOX_TRESHOLD=0.05, output_coord_in_ratio=True, ocr_bbox=None, draw_bbox_config=None, caption_model_processor=None, ocr_text=None, iou_threshold=0.1, imgsz=640, lazy_image=False):
+    """
+    Basic SOM labeling implementation using YOLO and OCR results.
+    Pass a Frame to share one decoded buffer with check_ocr_box; with lazy_image=True
+    the first return value is that Frame (call .base64() when the image is needed)
+    instead of an eagerly encoded JPEG.
+    """
     try:
-        # Convert PIL image to OpenCV format
-        if isinstance(image_input, Image.Image):
-            image_cv = cv2.cvtColor(np.array(image_input), cv2.COLOR_RGB2BGR)
-        else:
-            image_cv = image_input
+        frame = Frame.from_input(image_input, "som")
+        image_cv = frame.bgr()
         
         # Get YOLO predictions
         results = yolo_model(image_cv, conf=BOX_TRESHOLD, iou=iou_threshold, imgsz=imgsz)
@@ -158,12 +247,11 @@ def get_som_labeled_img(image_input, yolo_model, BOX_TRESHOLD=0.05, output_coord
                     
                     parsed_content_list.append(element)
         
-        # Create a simple labeled image (just return the original for now)
-        _, buffer = cv2.imencode('.jpg', image_cv)
-        labeled_img_base64 = base64.b64encode(buffer).decode('utf-8')
+        # The labeled image is just the original for now; encoding is cached on the frame
+        labeled_img = frame if lazy_image else frame.base64('.jpg')
         
         # Return results
-        return labeled_img_base64, [], parsed_content_list
+        return labeled_img, [], parsed_content_list
         
     except Exception as e:
         print(f"⚠️ SOM labeling error: {e}")
@@ -177,7 +265,7 @@ class AutomationManager:
         self.active_apps = {}
         self.browser_driver = None
         pyautogui.FAILSAFE = True  # Move mouse to corner to stop
-        pyautogui.PAUSE = 0.5  # Small delay between actions
+        pyautogui.PAUSE = 0.01  # Minimal gap between events; callers wait explicitly where the UI must settle
         
     def open_application(self, app_name: str, app_path: str = None, wait_time: int = 3) -> bool:
         """Open an application by name or path."""
@@ -219,6 +307,24 @@ class AutomationManager:
                 self.active_apps[app_name].kill()
                 del self.active_apps[app_name]
                 return True
+            elif get_process_table:
+                table = get_process_table()
+                for name, pids in table.matching(app_name).items():
+                    killed = False
+                    for pid in pids:
+                        # The table may be stale: never kill a PID that now belongs to another process
+                        proc = table.live_process(pid, name)
+                        if proc is None:
+                            continue
+                        try:
+                            proc.kill()
+                            killed = True
+                        except psutil.NoSuchProcess:
+                            pass
+                        table.forget(pid)
+                    if killed:
+                        return True
+                return False
             else:
                 # Try to find and kill by process name
                 for proc in psutil.process_iter(['pid', 'name']):
@@ -239,10 +345,12 @@ class AutomationManager:
             print(f"❌ Failed to click at ({x}, {y}): {e}")
             return False
     
-    def type_text(self, text: str, interval: float = 0.1) -> bool:
-        """Type text with optional interval between characters."""
+    def type_text(self, text: str, interval: float = None) -> bool:
+        """Type text; uses the fast entry path unless an explicit per-character interval is given."""
         try:
-            pyautogui.write(text, interval=interval)
+            if interval is None and enter_text:
+                return enter_text(text)
+            pyautogui.write(text, interval=interval or 0.0)
             return True
         except Exception as e:
             print(f"❌ Failed to type text: {e}")
@@ -270,8 +378,7 @@ class AutomationManager:
         """Find text on screen and click it using OCR."""
         try:
             # Take screenshot
-            screenshot = pyautogui.screenshot()
-            screenshot_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+            screenshot_cv = Frame.from_input(pyautogui.screenshot(), "click").bgr()
             
             # Use OCR to find text
             reader = easyocr.Reader(['en'])
@@ -493,6 +600,8 @@ def automate_browser_search(search_term: str = "Python automation") -> bool:
 def list_running_applications() -> List[str]:
     """List currently running applications."""
     try:
+        if get_process_table:
+            return get_process_table().names()
         running_apps = []
         for proc in psutil.process_iter(['pid', 'name']):
             try: